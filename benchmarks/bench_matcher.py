@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Microbenchmark of the expect pattern matching on the dmock command outputs.
+
+The command outputs of the emulated devices are repeated up to the requested size, followed by the device prompt
+and fed in chunks to the pexpect session with the same event list as used by the driver `wait_for_string` FSM.
+The time of waiting for the prompt is measured for:
+
+- full: the pexpect regular expression searcher rescanning the whole buffer (the behaviour before the incremental
+  search),
+- incremental: the incremental searcher searching each pattern separately,
+- combined: the incremental searcher searching all the patterns with the single combined regular expression.
+
+Usage::
+
+    python benchmarks/bench_matcher.py --size 256 --chunk 4096
+
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import glob
+import argparse
+from timeit import default_timer
+
+import pexpect
+from pexpect.spawnbase import SpawnBase
+from pexpect.expect import searcher_re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from condoor import pattern_manager  # noqa
+from condoor.searcher import IncrementalSearcher  # noqa
+
+DMOCK_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "dmock")
+
+# the prompt of the jumphost the device is connected through
+JUMPHOST_PROMPT = "[cisco@jumphost ~]$"
+
+# dmock directory, condoor platform, device prompt
+DEVICES = [
+    ("asr9k", "XR", "RP/0/RP0/CPU0:ios#"),
+    ("ncs5500", "eXR", "RP/0/RP0/CPU0:ios#"),
+    ("n9k", "NX-OS", "switch#"),
+    ("asr920", "IOS", "CSG-5502-ASR920#"),
+]
+
+
+class ChunkSpawn(SpawnBase):
+    """Spawn returning the data in chunks."""
+
+    def __init__(self, data, chunk):
+        super(ChunkSpawn, self).__init__(timeout=None, maxread=chunk)
+        self.data = data
+        self.position = 0
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if self.position >= len(self.data):
+            raise pexpect.EOF("EOF")
+        data = self.data[self.position:self.position + size]
+        self.position += size
+        return data
+
+
+def device_output(directory, prompt, size, events):
+    """Return the dmock command outputs repeated up to the size followed by the prompt.
+
+    The outputs matching any of the events, i.e. the syntax errors, are skipped.
+    """
+    outputs = []
+    for filename in sorted(glob.glob(os.path.join(DMOCK_DIR, directory, "*.txt"))):
+        with open(filename) as f:
+            output = f.read().replace("\n", "\r\n")
+        if not any(event.search(output) for event in events if event not in (pexpect.TIMEOUT, pexpect.EOF)):
+            outputs.append(output)
+    text = "\r\n".join(outputs)
+    return (text * (size // len(text) + 1))[:size] + "\r\n" + prompt
+
+
+def device_events(platform, prompt):
+    """Return the event list the same as for the driver `wait_for_string` FSM."""
+    pattern = pattern_manager.pattern(platform, "prompt_dynamic", compiled=False)
+    expected_re = re.compile(pattern.format(prompt=re.escape(prompt[:-1])))
+    pattern = pattern_manager.pattern("jumphost", "prompt_dynamic", compiled=False)
+    jumphost_re = re.compile(pattern.format(prompt=re.escape(JUMPHOST_PROMPT)))
+    return [pattern_manager.pattern(platform, "syntax_error"), pattern_manager.pattern(platform, "connection_closed"),
+            expected_re, pattern_manager.pattern(platform, "press_return"), pattern_manager.pattern(platform, "more"),
+            pexpect.TIMEOUT, pexpect.EOF, pattern_manager.pattern(platform, "buffer_overflow"),
+            jumphost_re]
+
+
+def measure(data, chunk, make_searcher, repeat):
+    """Return the best time of waiting for the prompt and the result."""
+    best = None
+    for _ in range(repeat):
+        spawn = ChunkSpawn(data, chunk)
+        searcher = make_searcher()
+        start = default_timer()
+        index = spawn.expect_loop(searcher, timeout=None)
+        elapsed = default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, (index, len(spawn.before), spawn.after)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--size", type=int, default=256, help="command output size in KB (default: 256)")
+    parser.add_argument("--chunk", type=int, default=4096, help="size of data read at once (default: 4096)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of measurements (default: 3)")
+    parser.add_argument("--no-full", action="store_true", help="skip the full search (quadratic time)")
+    args = parser.parse_args()
+
+    methods = [
+        ("incremental", lambda events: lambda: IncrementalSearcher(events)),
+        ("combined", lambda events: lambda: IncrementalSearcher(events, combine=True)),
+    ]
+    if not args.no_full:
+        methods.insert(0, ("full", lambda events: lambda: searcher_re(events)))
+
+    print("{:<10} {:>10} ".format("device", "size") + " ".join("{:>12}".format(name) for name, _ in methods))
+    for directory, platform, prompt in DEVICES:
+        events = device_events(platform, prompt)
+        data = device_output(directory, prompt, args.size * 1024, events)
+        times = []
+        results = set()
+        for _, factory in methods:
+            elapsed, result = measure(data, args.chunk, factory(events), args.repeat)
+            times.append(elapsed)
+            results.add(result)
+        if len(results) != 1:
+            print("{}: different results: {}".format(directory, results))
+            return 1
+
+        print("{:<10} {:>10} ".format(directory, len(data)) + " ".join("{:>11.4f}s".format(t) for t in times))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
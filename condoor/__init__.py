@@ -1,11 +1,16 @@
 """Init file for condoor."""
 
 from condoor.connection import Connection
+from condoor.pool import SessionPool
 from condoor.config import CONF
+from condoor.deadline import Deadline
+from condoor.device import SendResult
+from condoor.output import CommandOutput
 from condoor.patterns import YPatternManager as PatternManager
 
 from condoor.exceptions import CommandTimeoutError, ConnectionError, ConnectionTimeoutError, CommandError, \
-    CommandSyntaxError, ConnectionAuthenticationError, GeneralError, InvalidHopInfoError
+    CommandSyntaxError, ConnectionAuthenticationError, GeneralError, InvalidHopInfoError, DeadlineExceededError, \
+    ConnectionCancelledError
 from version import __version__
 
 from pexpect import TIMEOUT, EOF
@@ -18,6 +23,8 @@ This is a python module providing access to Cisco devices over Telnet and SSH.
 
 """
 
-__all__ = ('Connection', 'TIMEOUT', 'EOF', 'pattern_manager', 'CONF', 'InvalidHopInfoError',
+__all__ = ('Connection', 'SessionPool', 'TIMEOUT', 'EOF', 'pattern_manager', 'CONF', 'InvalidHopInfoError',
            'CommandTimeoutError', 'ConnectionError', 'ConnectionTimeoutError', 'CommandError',
-           'CommandSyntaxError', 'ConnectionAuthenticationError', 'GeneralError', '__version__')
+           'CommandSyntaxError', 'ConnectionAuthenticationError', 'GeneralError', 'Deadline', 'DeadlineExceededError',
+           'ConnectionCancelledError', 'SendResult', 'CommandOutput',
+           '__version__')
@@ -181,7 +181,8 @@ def a_store_cmd_result(ctx):
     if index > 0:
         # remove first line
         result = result[index + 1:]
-    ctx.device.last_command_result = result.replace('\r', '')
+    # the carriage returns are removed by CommandOutput
+    ctx.device.last_command_result = result
     return True
 
 
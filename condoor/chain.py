@@ -1,6 +1,9 @@
 """Provides the Chain class keeping the information about intermediate devices (jumphosts) on the paths to target."""
 import re
 import logging
+from collections import namedtuple
+
+import pexpect
 
 from condoor.device import Device
 from condoor.hopinfo import make_hop_info_from_url
@@ -10,28 +13,70 @@ from condoor.exceptions import ConnectionError
 
 logger = logging.getLogger(__name__)
 
+# The pattern never matching anything. The placeholder for the previous prompts of the first device.
+NEVER_MATCH_RE = re.compile("(?!x)x")
+
+# The node of the prefix tree keyed by HopInfo. The children attribute is the next level of the tree.
+_PrefixNode = namedtuple('_PrefixNode', 'device ctrl children')
+
+
+def make_chains(connection, url_lists):
+    """Build the connection chains sharing the jumphosts with the common prefix.
 
-def device_gen(chain, urls):
-    """Device object generator."""
-    itr = iter(urls)
-    last = next(itr)
-    for url in itr:
-        yield Device(chain, make_hop_info_from_url(last), driver_name='jumphost', is_target=False)
-        last = url
-    yield Device(chain, make_hop_info_from_url(last), driver_name='generic', is_target=True)
+    The chains are organized in the prefix tree keyed by :class:`condoor.hopinfo.HopInfo` objects. The chains with
+    the same first hops share the session controller and the jumphost device objects, so the failover to the
+    sibling chain requires to spawn only the part of the chain which differs.
+    """
+    prefix_tree = {}
+    return [Chain(connection, urls, prefix_tree) for urls in url_lists]
 
 
 class Chain(object):
     """Chain class keeping information about the intermediate jumphosts and target device."""
 
-    def __init__(self, connection, urls):
-        """Initialize the new Chain object."""
+    def __init__(self, connection, urls, prefix_tree=None):
+        """Initialize the new Chain object.
+
+        Args:
+            connection (object): The :class:`condoor.Connection` object.
+            urls (list): List of urls describing the path to the target device.
+            prefix_tree (dict): Optional prefix tree shared with other chains. If provided the jumphosts already
+                existing in the tree are reused. Refer to :func:`make_chains`.
+        """
         self.connection = connection
-        self.ctrl = Controller(connection)
-        self.devices = [device for device in device_gen(self, urls)]
+        self.urls = urls
+        self.ctrl = None
+        self.devices = []
+
+        hop_infos = [make_hop_info_from_url(url) for url in urls]
+        level = prefix_tree if prefix_tree is not None else {}
+        for hop_info in hop_infos[:-1]:
+            node = level.get(hop_info)
+            if node is None:
+                device = Device(self, hop_info, driver_name='jumphost', is_target=False)
+                node = level[hop_info] = _PrefixNode(device, self.ctrl or Controller(connection), {})
+            self.ctrl = node.ctrl
+            self.devices.append(node.device)
+            level = node.children
+
+        if self.ctrl is None:
+            self.ctrl = Controller(connection)
+
+        self.devices.append(Device(self, hop_infos[-1], driver_name='generic', is_target=True))
         self.target_device.driver_name = 'generic'
         self.target_device.is_target = True
 
+    def detach(self):
+        """Return the copy of the chain with its own session and jumphost devices not shared with other chains.
+
+        The device information is copied, so the detached chain connects the same way as the original one.
+        """
+        chain = Chain(self.connection, self.urls)
+        chain.ctrl.cancel_event = self.ctrl.cancel_event
+        chain.ctrl.deadline = self.ctrl.deadline
+        chain.update([device.device_info for device in self.devices])
+        return chain
+
     def __repr__(self):
         """Return the string representation of devices in the chain."""
         name = ""
@@ -48,7 +93,7 @@ class Chain(object):
                 self.connection.emit_message("Connecting {}".format(str(device)), log_level=logging.INFO)
                 protocol_name = device.get_protocol_name()
                 device.protocol = make_protocol(protocol_name, device)
-                self.ctrl.spawn_session(device.protocol.get_command())
+                device.protocol.spawn_session(self.ctrl)
                 if device.connect(self.ctrl):
                     # logger.info("Connected to {}".format(device))
                     self.connection.emit_message("Connected {}".format(device), log_level=logging.INFO)
@@ -72,6 +117,19 @@ class Chain(object):
         self.ctrl.disconnect()
         self.tail_disconnect(-1)
 
+    def keepalive(self, timeout):
+        """Send the newline and wait for the target device prompt. Return True if the prompt is received."""
+        if not self.is_connected:
+            return False
+
+        events = [self.target_device.prompt_re, pexpect.TIMEOUT, pexpect.EOF]
+        try:
+            self.ctrl.sendline()  # pylint: disable=no-member
+            index = self.ctrl.expect(events, timeout=timeout)  # pylint: disable=no-member
+        except OSError:
+            return False
+        return index == 0
+
     @property
     def target_device(self):
         """Return the target device object (last) in the chain."""
@@ -111,7 +169,7 @@ class Chain(object):
     def get_previous_prompts(self, device):
         """Return the list of intermediate prompts. All except target."""
         device_index = self.devices.index(device)
-        prompts = [re.compile("(?!x)x")] + [dev.prompt_re for dev in self.devices[:device_index]]
+        prompts = [NEVER_MATCH_RE] + [dev.prompt_re for dev in self.devices[:device_index]]
         return prompts
 
     def get_device_index_based_on_prompt(self, prompt):
@@ -131,9 +189,40 @@ class Chain(object):
         except IndexError:
             pass
 
-    def send(self, cmd, timeout, wait_for_string):
+    def rewind(self):
+        """Bring the session back to the prompt of the last jumphost still connected after the connection failure.
+
+        If the prompt can't be detected or does not belong to any device in the chain the whole chain
+        is disconnected. It allows to connect the sibling chain sharing the same jumphosts without
+        connecting them from scratch.
+
+        Returns:
+            int: The index of the device the session is connected to or *None* if disconnected.
+        """
+        index = None
+        if self.ctrl.is_connected:
+            try:
+                # abort the pending connection attempt if any
+                self.ctrl.sendcontrol('c')  # pylint: disable=no-member
+                prompt = self.ctrl.detect_prompt()
+                index = self.get_device_index_based_on_prompt(prompt)
+            except (ConnectionError, pexpect.EOF, pexpect.TIMEOUT, OSError):
+                index = None
+
+        if index is None:
+            self.disconnect()
+        else:
+            self.connection.emit_message("Session rewound to {}".format(self.devices[index]), log_level=logging.INFO)
+            self.tail_disconnect(index)
+        return index
+
+    def send(self, cmd, timeout, wait_for_string, sink=None):
         """Send command to the target device."""
-        return self.target_device.send(cmd, timeout=timeout, wait_for_string=wait_for_string)
+        return self.target_device.send(cmd, timeout=timeout, wait_for_string=wait_for_string, sink=sink)
+
+    def send_many(self, cmds, timeout, window):
+        """Send the commands to the target device writing ahead."""
+        return self.target_device.send_many(cmds, timeout=timeout, window=window)
 
     def update(self, data):
         """Update the chain object with the predefined data."""
@@ -2,14 +2,22 @@
 import re
 import os
 import time
+import Queue
 import shelve
 import logging
+import threading
+import pexpect
 from hashlib import md5
 
-from collections import deque
-from condoor.chain import Chain
-from condoor.exceptions import ConnectionError, ConnectionTimeoutError
-from condoor.utils import FilteredFile, normalize_urls, make_handler
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from condoor.chain import make_chains
+from condoor.config import CONF
+from condoor.deadline import make_deadline
+from condoor.exceptions import ConnectionError, ConnectionTimeoutError, DeadlineExceededError, ConnectionCancelledError
+from condoor.keepalive import Keepalive
+from condoor.stats import FSMStats
+from condoor.utils import FilteredFile, normalize_urls, make_handler, hops_reachability
 from condoor.version import __version__
 
 logger = logging.getLogger(__name__)
@@ -17,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 _CACHE_FILE = "/tmp/condoor." + __version__ + ".shelve"
 
+_C = CONF['connection']
+
 
 class Connection(object):
     """Connection class providing the condoor API.
@@ -76,7 +86,16 @@ class Connection(object):
         """
         self._discovered = False
         self._last_chain_index = 0
+        # index -> the original chain sharing the jumphosts replaced by the detached chain connected in parallel
+        self._detached_chains = {}
         self._msg_callback = None
+        # serializes the session access between the API calls and the keepalive
+        self._session_lock = threading.RLock()
+        self._keepalive_thread = None
+        self._fsm_stats = FSMStats()
+        # set by cancel to stop the operation in progress
+        self._cancel_event = threading.Event()
+        self._cancel_ctrl_c = False
 
         self.log_session = log_session
         top_logger = logging.getLogger("condoor")
@@ -95,7 +114,9 @@ class Connection(object):
         top_logger.info("Condoor Version {}".format(__version__))
         top_logger.debug("Cache filename: {}".format(_CACHE_FILE))
 
-        self.connection_chains = [Chain(self, url_list) for url_list in normalize_urls(urls)]
+        self.connection_chains = make_chains(self, normalize_urls(urls))
+        for chain in self.connection_chains:
+            chain.ctrl.cancel_event = self._cancel_event
 
     def __del__(self):
         """Clean up the object."""
@@ -103,6 +124,12 @@ class Connection(object):
             top_logger = logging.getLogger("condoor")
             top_logger.removeHandler(self._handler)
 
+    def _set_session_fd(self, logfile):
+        """Set the session logfile of the connection and of the chain controllers created in the constructor."""
+        self.session_fd = logfile
+        for chain in self.connection_chains:
+            chain.ctrl.set_logfile(logfile)
+
     def _make_session_fd(self, log_dir):
         session_fd = None
         if log_dir is not None:
@@ -167,7 +194,167 @@ class Connection(object):
         chain_indices.rotate(self._last_chain_index)
         return chain_indices
 
-    def connect(self, logfile=None, force_discovery=False):
+    def _reachable_chain_indices(self, indices):
+        """Return the indices of the chains with the first hop reachable keeping the order.
+
+        The first hops of all the chains are checked concurrently. Only the first hop is checked as the next hops
+        are reachable only from the previous jumphost.
+
+        Raises:
+            ConnectionError: If none of the chains has the first hop reachable.
+        """
+        first_hops = [self.connection_chains[index].devices[0].node_info for index in indices]
+        begin = time.time()
+        reachability = hops_reachability(first_hops, timeout=_C['reachability_timeout'])
+        logger.debug("Reachability checked in {:.2f}s".format(time.time() - begin))
+
+        reachable = deque()
+        for index, hop_info in zip(indices, first_hops):
+            if reachability[hop_info]:
+                reachable.append(index)
+            else:
+                self.emit_message("Connection chain [{}] skipped: {} not reachable".format(index + 1, hop_info),
+                                  log_level=logging.WARNING)
+
+        if not reachable:
+            raise ConnectionError("Device not reachable")
+        return reachable
+
+    def _connect_chains(self, indices, stop=None, chains=None):
+        """Try the connection chains one by one and return the index of the first one connected to the target.
+
+        If the chain fails and the next chains share the jumphosts with it, the session is rewound to the last
+        jumphost connected, so only the differing tail of the next chain is connected. Otherwise the failed chain
+        is disconnected.
+
+        Args:
+            indices (list): The chain indices to try in order.
+            stop (threading.Event): Optional event stopping the attempts when set.
+            chains (list): Optional list of the chains the indices refer to. Defaults to the `connection_chains`.
+        """
+        if chains is None:
+            chains = self.connection_chains
+        excpt = ConnectionError("Could not connect to the device.")
+        indices = list(indices)
+        for attempt, index in enumerate(indices, start=1):
+            if stop is not None and stop.is_set():
+                break
+
+            self.emit_message("Connection chain/attempt [{}/{}]".format(index + 1, attempt), log_level=logging.INFO)
+            chain = chains[index]
+            try:
+                if chain.connect():
+                    return index
+            except (DeadlineExceededError, ConnectionCancelledError):
+                chain.disconnect()
+                raise
+            except (ConnectionTimeoutError, ConnectionError) as e:  # pylint: disable=invalid-name
+                self.emit_message("Connection error: {}".format(e), log_level=logging.ERROR)
+                excpt = e
+
+            if any(chains[next_index].ctrl is chain.ctrl for next_index in indices[attempt:]):
+                chain.rewind()
+            else:
+                chain.disconnect()
+
+        raise excpt
+
+    def _detach_shared_chains(self):
+        """Return the list of the chains with the chains sharing the jumphosts given their own sessions.
+
+        The list is used for the parallel connect only, so the `connection_chains` keep sharing the jumphosts for
+        the sequential failover. The chains sharing the session already connected are left shared. With the
+        `multiplex_jumphosts` enabled the detached sessions are the channels of the same master session.
+        """
+        chains = list(self.connection_chains)
+        ctrls = set()
+        for index, chain in enumerate(chains):
+            if id(chain.ctrl) in ctrls and not chain.ctrl.is_connected:
+                chain = chains[index] = chain.detach()
+                logger.debug("Connection chain [{}] detached for the parallel connect".format(index + 1))
+            ctrls.add(id(chain.ctrl))
+        return chains
+
+    def _restore_detached_chains(self):
+        """Put back the original chains sharing the jumphosts in place of the detached ones not connected."""
+        for index, chain in list(self._detached_chains.items()):
+            if not self.connection_chains[index].is_connected:
+                self.connection_chains[index] = chain
+                del self._detached_chains[index]
+
+    def _connect_in_parallel(self, indices):
+        """Start the connection chains concurrently and keep the first one connected to the target device.
+
+        The chains still sharing the session after :meth:`_detach_shared_chains`, i.e. the session already
+        connected, can't be connected concurrently, so they are tried one by one in a single thread. The detached
+        chain connected replaces the original one until disconnected.
+        """
+        chains = self._detach_shared_chains()
+        groups = OrderedDict()
+        for index in indices:
+            groups.setdefault(id(chains[index].ctrl), []).append(index)
+
+        for group in groups.values():
+            if len(group) > 1:
+                self.emit_message("Connection chains {} share the connected session and are tried one by one".format(
+                    [index + 1 for index in group]), log_level=logging.INFO)
+
+        if len(groups) == 1:
+            return self._connect_chains(groups.values()[0], chains=chains)
+
+        results = Queue.Queue()
+        stop = threading.Event()
+
+        def connect_group(indices):
+            """Connect the chains from the group and report the result."""
+            try:
+                results.put((indices, self._connect_chains(indices, stop, chains), None))
+            except Exception as e:  # pylint: disable=invalid-name,broad-except
+                results.put((indices, None, e))
+
+        threads = []
+        for indices in groups.values():
+            self.emit_message("Connection chains {} started".format([index + 1 for index in indices]),
+                              log_level=logging.INFO)
+            thread = threading.Thread(target=connect_group, args=(indices,),
+                                      name="chain-{}".format(indices[0] + 1))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        excpt = ConnectionError("Could not connect to the device.")
+        winner = None
+        for _ in threads:
+            indices, index, error = results.get()
+            if index is not None:
+                winner = index
+                self.emit_message("Connection chain [{}] won".format(index + 1), log_level=logging.INFO)
+                break
+            self.emit_message("Connection chains {} error: {}".format([i + 1 for i in indices], error),
+                              log_level=logging.ERROR)
+            if isinstance(error, ConnectionError):
+                excpt = error
+
+        stop.set()
+        losers = [chain for chain in chains if winner is None or chain.ctrl is not chains[winner].ctrl]
+        # the disconnect closes the sessions so the chains still connecting stop waiting for the device
+        for chain in losers:
+            chain.disconnect()
+        for thread in threads:
+            thread.join(_C['parallel_teardown_timeout'])
+        # the chain could spawn the new session just before the disconnect
+        for chain in losers:
+            if chain.is_connected:
+                chain.disconnect()
+
+        if winner is None:
+            raise excpt
+        if chains[winner] is not self.connection_chains[winner]:
+            self._detached_chains[winner] = self.connection_chains[winner]
+            self.connection_chains[winner] = chains[winner]
+        return winner
+
+    def connect(self, logfile=None, force_discovery=False, parallel=False, check_reachability=None, deadline=None):
         """Connect to the device.
 
         Args:
@@ -177,6 +364,19 @@ class Connection(object):
 
             force_discovery (Bool): Optional. If True the device discover process will start after getting connected.
 
+            parallel (Bool): Optional. If True all the connection chains are started concurrently and the first
+                one connected to the target device is used. The remaining chains are disconnected. Makes sense only
+                when multiple connection chains are provided, i.e. for dual console access. The chains sharing the
+                jumphosts get their own sessions. Only the chains sharing the session already connected are tried
+                one by one.
+
+            check_reachability (Bool): Optional. If True the first hops of all the chains are checked concurrently
+                with the short TCP connect timeout before connecting. The chains with the first hop not reachable
+                are skipped. If *None* the configured value is used.
+
+            deadline (Deadline): Optional. The :class:`condoor.Deadline` object or the time in seconds the whole
+                connection through all the jumphosts must finish within.
+
         Raises:
             ConnectionError: If the discovery method was not called first or there was a problem with getting
                 the connection.
@@ -185,43 +385,39 @@ class Connection(object):
 
             ConnectionTimeoutError: If the connection timeout happened.
 
+            DeadlineExceededError: If the deadline passed.
+
         """
         if logfile:
-            self.session_fd = logfile
+            self._set_session_fd(logfile)
 
         self._clear_cache() if force_discovery else self._read_cache()
 
-        excpt = ConnectionError("Could not connect to the device.")
-
         chains = len(self.connection_chains)
         for index, chain in enumerate(self.connection_chains, start=1):
             self.emit_message("Connection chain {}/{}: {}".format(index, chains, str(chain)), log_level=logging.INFO)
 
-        begin = time.time()
-        attempt = 1
-        for index in self._chain_indices():
-            self.emit_message("Connection chain/attempt [{}/{}]".format(index + 1, attempt), log_level=logging.INFO)
+        if check_reachability is None:
+            check_reachability = _C['check_reachability']
 
-            chain = self.connection_chains[index]
-            self._last_chain_index = index
-            try:
-                if chain.connect():
-                    break
-            except (ConnectionTimeoutError, ConnectionError) as e:  # pylint: disable=invalid-name
-                self.emit_message("Connection error: {}".format(e), log_level=logging.ERROR)
-                excpt = e
+        begin = time.time()
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline):
+            self._restore_detached_chains()
+            indices = self._chain_indices()
+            if check_reachability:
+                indices = self._reachable_chain_indices(indices)
 
-            attempt += 1
-        else:
-            # invalidate cache
-            raise excpt
+            if parallel and len(indices) > 1:
+                self._last_chain_index = self._connect_in_parallel(indices)
+            else:
+                self._last_chain_index = self._connect_chains(indices)
 
         self._write_cache()
         elapsed = time.time() - begin
         self.emit_message("Target device connected in {:.2f}s.".format(elapsed), log_level=logging.INFO)
         logger.debug("-" * 20)
 
-    def reconnect(self, logfile=None, max_timeout=360, force_discovery=False):
+    def reconnect(self, logfile=None, max_timeout=360, force_discovery=False, deadline=None):
         """Reconnect to the device.
 
         It can be called when after device reloads or the session was
@@ -238,6 +434,9 @@ class Connection(object):
 
             force_discovery (Bool): Optional. If True the device discover process will start after getting connected.
 
+            deadline (Deadline): Optional. The :class:`condoor.Deadline` object or the time in seconds the reconnect
+                must finish within including the connection attempts in progress.
+
         Raises:
             ConnectionError: If the discovery method was not called first or there was a problem with getting
              the connection.
@@ -246,9 +445,11 @@ class Connection(object):
 
             ConnectionTimeoutError: If the connection timeout happened.
 
+            DeadlineExceededError: If the deadline passed.
+
         """
         if logfile:
-            self.session_fd = logfile
+            self._set_session_fd(logfile)
 
         if force_discovery:
             self._clear_cache()
@@ -270,70 +471,176 @@ class Connection(object):
         attempt = 1
         elapsed = 0
 
-        while max_timeout - elapsed > 0:
-            if sleep_time > 0:
-                self.emit_message("Waiting {:.0f}s before next connection attempt".format(sleep_time), log_level=logging.INFO)
-                time.sleep(sleep_time)
-
-            # up
-            elapsed = time.time() - begin
-            # logger.debug("Connection attempt {} Elapsed {:.1f}s".format(attempt, elapsed))
-            try:
-                index = chain_indices[0]
-                self.emit_message("Connection chain/attempt [{}/{}]".format(index + 1, attempt),
-                                  log_level=logging.INFO)
-
-                chain = self.connection_chains[index]
-                self._last_chain_index = index
-                if chain.connect():
-                    break
-            except (ConnectionTimeoutError, ConnectionError) as e:  # pylint: disable=invalid-name
-                if chain.ctrl.is_connected:
-                    prompt = chain.ctrl.detect_prompt()
-                    index = chain.get_device_index_based_on_prompt(prompt)
-                    chain.tail_disconnect(index)
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline) as deadline:
+            self._restore_detached_chains()
+            while max_timeout - elapsed > 0:
+                if sleep_time > 0:
+                    self.emit_message("Waiting {:.0f}s before next connection attempt".format(sleep_time),
+                                      log_level=logging.INFO)
+                    if self._cancel_event.wait(sleep_time):
+                        raise ConnectionCancelledError("Operation cancelled", self.hostname)
 
-                self.emit_message("Connection error: {}".format(e), log_level=logging.ERROR)
-                chain_indices.rotate(-1)
-                excpt = e
-            finally:
-                # TODO: Make a configuration parameter
+                # up
                 elapsed = time.time() - begin
-                sleep_time = min(30, max_timeout - elapsed)
-                self.emit_message("Time elapsed {:.0f}s/{:.0f}s".format(elapsed, max_timeout), log_level=logging.INFO)
-
-            attempt += 1
-        else:
-            self.emit_message("Unable to (re)connect within {:.0f}s".format(elapsed), log_level=logging.ERROR)
-            raise excpt
+                # logger.debug("Connection attempt {} Elapsed {:.1f}s".format(attempt, elapsed))
+                try:
+                    index = chain_indices[0]
+                    self.emit_message("Connection chain/attempt [{}/{}]".format(index + 1, attempt),
+                                      log_level=logging.INFO)
+
+                    chain = self.connection_chains[index]
+                    self._last_chain_index = index
+                    if chain.connect():
+                        break
+                except (DeadlineExceededError, ConnectionCancelledError):
+                    chain.disconnect()
+                    raise
+                except (ConnectionTimeoutError, ConnectionError) as e:  # pylint: disable=invalid-name
+                    self.emit_message("Connection error: {}".format(e), log_level=logging.ERROR)
+                    chain_indices.rotate(-1)
+                    if self.connection_chains[chain_indices[0]].ctrl is chain.ctrl:
+                        chain.rewind()
+                    else:
+                        chain.disconnect()
+                    excpt = e
+                finally:
+                    # TODO: Make a configuration parameter
+                    elapsed = time.time() - begin
+                    sleep_time = min(30, max_timeout - elapsed)
+                    if deadline is not None:
+                        sleep_time = min(sleep_time, deadline.remaining)
+                    self.emit_message("Time elapsed {:.0f}s/{:.0f}s".format(elapsed, max_timeout),
+                                      log_level=logging.INFO)
+
+                attempt += 1
+                if deadline is not None and deadline.expired:
+                    self.emit_message("Unable to (re)connect within the deadline", log_level=logging.ERROR)
+                    raise DeadlineExceededError("Deadline exceeded", self.hostname)
+            else:
+                self.emit_message("Unable to (re)connect within {:.0f}s".format(elapsed), log_level=logging.ERROR)
+                raise excpt
 
         self._write_cache()
         self.emit_message("Target device connected in {:.0f}s.".format(elapsed), log_level=logging.INFO)
         logger.debug("-" * 20)
 
-    def send(self, cmd="", timeout=60, wait_for_string=None):
+    def send(self, cmd="", timeout=60, wait_for_string=None, deadline=None, sink=None):
         """Send the command to the device and return the output.
 
+        If the `sink` is passed the output is written to it as it is received and only the output metadata is
+        returned, so the memory used does not depend on the output size, i.e.::
+
+            with open("running-config.txt", "w") as f:
+                result = conn.send("show running-config", sink=f)
+            print(result.size, result.lines, result.digest)
+
         Args:
             cmd (str): Command string for execution. Defaults to empty string.
             timeout (int): Timeout in seconds. Defaults to 60s
             wait_for_string (str): This is optional string that driver
                 waits for after command execution. If none the detected
                 prompt will be used.
+            deadline (Deadline): Optional :class:`condoor.Deadline` object or the time in seconds the command
+                must finish within. The `timeout` is limited to the time remaining to the deadline.
+            sink: Optional file-like object open for write or the function the command output is written to.
+                The output is the same as returned without the `sink` unless the driver extracts the command result
+                from the output of the other command, i.e. eXR admin commands. Then the whole output is written.
 
         Returns:
-            A string containing the command output.
+            :class:`condoor.CommandOutput` string containing the command output with the command metadata or
+            :class:`condoor.SendResult` object with the number of bytes and lines written to the sink, the command
+            duration and the SHA-256 digest of the output.
+
+        Raises:
+            ConnectionError: General connection error during command execution
+            CommandSyntaxError: Command syntax error or unknown command.
+            CommandTimeoutError: Timeout during command execution
+            DeadlineExceededError: If the deadline passed.
+        """
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline):
+            return self._chain.send(cmd, timeout, wait_for_string, sink)
+
+    def send_many(self, cmds, timeout=60, window=None, deadline=None):
+        """Send the commands to the device and return the list of outputs.
+
+        Up to `window` commands are written ahead without waiting for the prompt, so over the long round trip time
+        connections the commands take much less time than sent one by one with :meth:`send`. The outputs are split
+        on the command echo and the device prompt. The commands must not change the prompt and the device must not
+        page the output, i.e. the terminal length must be 0.
+
+        Args:
+            cmds (list): The list of the commands.
+            timeout (int): Timeout in seconds for each command. Defaults to 60s
+            window (int): The maximum number of the commands sent and not completed. Defaults to
+                `send_many_window` from the configuration.
+            deadline (Deadline): Optional :class:`condoor.Deadline` object or the time in seconds all the commands
+                must finish within.
+
+        Returns:
+            list: The list of the command outputs in the same order as the commands.
+
+        Raises:
+            ConnectionError: General connection error during command execution
+            CommandSyntaxError: Command syntax error or unknown command. The `command` attribute is the failed
+                command. The commands written ahead are executed by the device before the exception is raised.
+            CommandError: The command echo not received after the output of the previous command, i.e. the device
+                echoes the commands written ahead before the previous command completes. Send the commands with
+                `window` 1 to such device.
+            CommandTimeoutError: Timeout during command execution
+            DeadlineExceededError: If the deadline passed.
+        """
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline):
+            return self._chain.send_many(cmds, timeout, window)
+
+    def send_iter(self, cmd="", timeout=60, wait_for_string=None, deadline=None):
+        """Send the command to the device and yield the output lines as they are received.
+
+        The output is not collected in memory, so this method is suitable for very large outputs, i.e.::
+
+            for line in conn.send_iter("show running-config"):
+                backup.write(line + "\n")
+
+        The session is locked until the generator is exhausted or closed. If the generator is closed before the
+        whole output is received (i.e. the loop is broken) the Ctrl-C is sent to the device and the prompt is
+        expected for `cancel_prompt_timeout` seconds. The session is disconnected if the prompt is not received.
+
+        The session lock is held by the thread which started the iteration, so the generator must be consumed and
+        closed in that thread. Closing it from the other thread raises RuntimeError. Use :meth:`cancel` to stop
+        the iteration from the other thread.
+
+        Args:
+            cmd (str): Command string for execution. Defaults to empty string.
+            timeout (int): Timeout in seconds. Defaults to 60s
+            wait_for_string (str): This is optional string that driver
+                waits for after command execution. If none the detected
+                prompt will be used.
+            deadline (Deadline): Optional :class:`condoor.Deadline` object or the time in seconds the command
+                must finish within. The `timeout` is limited to the time remaining to the deadline.
+
+        Yields:
+            str: The command output lines without the line ends.
 
         Raises:
             ConnectionError: General connection error during command execution
             CommandSyntaxError: Command syntax error or unknown command.
             CommandTimeoutError: Timeout during command execution
+            DeadlineExceededError: If the deadline passed.
         """
-        return self._chain.send(cmd, timeout, wait_for_string)
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline):
+            lines = self._chain.target_device.send_iter(cmd, timeout, wait_for_string)
+            try:
+                for line in lines:
+                    yield line
+            except GeneratorExit:
+                lines.close()
+                self._recover_cancelled(send_ctrl_c=True)
+                raise
 
     def disconnect(self):
         """Disconnect the session from the device and all the jumphosts in the path."""
-        self._chain.disconnect()
+        self.stop_keepalive()
+        with self._session_lock:
+            self._chain.disconnect()
 
     def discovery(self, logfile=None):
         """Discover the device details.
@@ -360,14 +667,16 @@ class Connection(object):
             enable_password (str): The privileged mode password. This is optional parameter. If password is not
                 provided but required the password from url will be used. Refer to :class:`condoor.Connection`
         """
-        self._chain.target_device.enable(enable_password)
+        with self._session_lock:
+            self._chain.target_device.enable(enable_password)
 
     def reload(self, reload_timeout=300, save_config=True, no_reload_cmd=False):
         """Reload the device and wait for device to boot up."""
         self._clear_cache()
-        self._chain.target_device.reload(reload_timeout, save_config, no_reload_cmd)
+        with self._session_lock, self._cancel_scope():
+            self._chain.target_device.reload(reload_timeout, save_config, no_reload_cmd)
 
-    def run_fsm(self, name, command, events, transitions, timeout, max_transitions=20):
+    def run_fsm(self, name, command, events, transitions, timeout, max_transitions=20, deadline=None):
         """Instantiate and run the Finite State Machine for the current device connection.
 
         Here is the example of usage::
@@ -401,6 +710,8 @@ class Connection(object):
             transitions (list): List of tuples in defining the state machine transitions.
             timeout (int): Default timeout between states in seconds.
             max_transitions (int): Default maximum number of transitions allowed for FSM.
+            deadline (Deadline): Optional :class:`condoor.Deadline` object or the time in seconds the FSM
+                must finish within. The state timeouts are limited to the time remaining to the deadline.
 
         The transition tuple format is as follows::
 
@@ -441,7 +752,116 @@ class Connection(object):
         If action returns False then FSM returns False. FSM returns True if reaches the -1 state.
 
         """
-        return self._chain.target_device.run_fsm(name, command, events, transitions, timeout, max_transitions)
+        with self._session_lock, self._cancel_scope(), self._deadline_scope(deadline):
+            return self._chain.target_device.run_fsm(name, command, events, transitions, timeout, max_transitions)
+
+    def start_keepalive(self, interval=None, timeout=None, callback=None):
+        """Start sending the keepalive to the idle session in the background.
+
+        The newline is sent every `interval` seconds and the device prompt is expected. The keepalive is
+        serialized with the other methods, so it never interleaves with the command. If the prompt is not
+        received the error message is emitted, the `callback` is called and the keepalive stops.
+        The keepalive is stopped on :meth:`disconnect`.
+
+        Args:
+            interval (int): The time in seconds between the keepalives. If *None* the configured value is used.
+            timeout (int): The time in seconds to wait for the prompt. If *None* the configured value is used.
+            callback (func): Optional function called with the connection object as an argument when the session
+                is detected dead.
+        """
+        self.stop_keepalive()
+        self._keepalive_thread = Keepalive(self,
+                                           interval if interval is not None else _C['keepalive_interval'],
+                                           timeout if timeout is not None else _C['keepalive_timeout'],
+                                           callback)
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self):
+        """Stop sending the keepalive."""
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.stop()
+            self._keepalive_thread = None
+
+    def _keepalive(self, timeout):
+        """Send the keepalive. Return None if the session is busy, otherwise True if the session is alive."""
+        if not self._session_lock.acquire(False):
+            return None
+        try:
+            return self._chain.keepalive(timeout)
+        finally:
+            self._session_lock.release()
+
+    def cancel(self, send_ctrl_c=False):
+        """Cancel the operation in progress from the other thread.
+
+        The thread waiting for the device output in :meth:`connect`, :meth:`reconnect`, :meth:`send`,
+        :meth:`send_iter`, :meth:`send_many`, :meth:`run_fsm` or :meth:`reload` is woken within
+        `cancel_poll_interval` seconds and the operation raises :class:`condoor.ConnectionCancelledError`.
+        If no operation is in progress the next one is cancelled.
+        The cancelled connect leaves the session disconnected. Otherwise the device prompt is expected for
+        `cancel_prompt_timeout` seconds and the session is disconnected if not received.
+
+        Args:
+            send_ctrl_c (Bool): If True the Ctrl-C is sent to the device to abort the command in progress before
+                waiting for the prompt.
+        """
+        self._cancel_ctrl_c = send_ctrl_c
+        self._cancel_event.set()
+
+    @contextmanager
+    def _cancel_scope(self):
+        """Bring the session to the known state if the operation is cancelled."""
+        try:
+            yield
+        except ConnectionCancelledError:
+            self._cancel_event.clear()
+            self._recover_cancelled(self._cancel_ctrl_c)
+            raise
+
+    def _recover_cancelled(self, send_ctrl_c):
+        """Wait for the target device prompt after the operation is cancelled or disconnect the session."""
+        chain = self._chain
+        if not chain.is_connected:
+            return
+
+        events = [chain.target_device.prompt_re, pexpect.TIMEOUT, pexpect.EOF]
+        try:
+            if send_ctrl_c:
+                chain.ctrl.sendcontrol('c')  # pylint: disable=no-member
+            index = chain.ctrl.expect(events, timeout=_C['cancel_prompt_timeout'])
+        except (OSError, ConnectionError):
+            index = None
+
+        if index == 0:
+            self.emit_message("Operation cancelled. Session at the device prompt", log_level=logging.INFO)
+        else:
+            self.emit_message("Operation cancelled. Disconnecting the session", log_level=logging.WARNING)
+            chain.disconnect()
+
+    @contextmanager
+    def _deadline_scope(self, deadline):
+        """Set the deadline on the controllers of all the chains for the time of the operation.
+
+        The earlier deadline already set by the outer operation is kept.
+        """
+        deadline = make_deadline(deadline)
+        if deadline is None:
+            yield None
+            return
+
+        previous = OrderedDict((id(chain.ctrl), (chain.ctrl, chain.ctrl.deadline)) for chain in self.connection_chains)
+        for ctrl, outer in previous.values():
+            if outer is None or outer.expires > deadline.expires:
+                ctrl.deadline = deadline
+        try:
+            yield deadline
+        finally:
+            for ctrl, outer in previous.values():
+                ctrl.deadline = outer
+            # i.e. the chain detached for the parallel connect
+            for chain in self.connection_chains:
+                if id(chain.ctrl) not in previous:
+                    chain.ctrl.deadline = None
 
     def emit_message(self, message, log_level):
         """Call the msg callback function with the message."""
@@ -466,6 +886,14 @@ class Connection(object):
     def _chain(self):
         return self.connection_chains[self._last_chain_index]
 
+    @property
+    def fsm_stats(self):
+        """Return the :class:`condoor.stats.FSMStats` object with the statistics of the FSMs run on the connection.
+
+        The statistics are collected if `fsm_stats` is enabled in the connection configuration.
+        """
+        return self._fsm_stats
+
     @property
     def is_connected(self):
         """Return if target device is connected."""
@@ -648,3 +1076,24 @@ class Connection(object):
             logger.debug("Invalid connection information")
 
         logger.debug("Connection information updated from cache.")
+
+
+def make_connection(name, urls, log_dir=None, log_level=logging.INFO, log_session=False):
+    """Return the Connection object logging to the subdirectory named after the connection.
+
+    It is used by :class:`condoor.fleet.Fleet` and :class:`condoor.SessionPool` handling many connections.
+
+    Args:
+        name (str): The connection name.
+        urls (str or list): The connection urls. Refer to :class:`condoor.Connection`.
+        log_dir (str): The path to the directory the connection log subdirectory is created in. If *None* logs are
+         redirected to *stdout*.
+        log_level (int): The condoor logging level.
+        log_session (Bool): If **True** the terminal session is logged.
+    """
+    if log_dir is not None:
+        log_dir = os.path.join(log_dir, name)
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+    return Connection(name, urls, log_dir=log_dir, log_level=log_level, log_session=log_session)
@@ -3,16 +3,25 @@
 import re
 import logging
 import pexpect
+from pexpect.expect import Expecter
 from time import time
+from functools import partial
+from collections import deque
+from contextlib import contextmanager
 
 from condoor.utils import delegate, levenshtein_distance
-from condoor.exceptions import ConnectionError, ConnectionTimeoutError
+from condoor.telnetspawn import TelnetSpawn
+from condoor.searcher import IncrementalSearcher
+from condoor.exceptions import ConnectionError, ConnectionTimeoutError, DeadlineExceededError, ConnectionCancelledError
+from condoor.config import CONF
 
 logger = logging.getLogger(__name__)
 
+_C = CONF['connection']
+
 
 # Delegate following methods to _session class
-@delegate("_session", ("expect", "expect_exact", "expect_list", "compile_pattern_list", "sendline",
+@delegate("_session", ("expect_list", "compile_pattern_list", "sendline",
                        "isalive", "sendcontrol", "send", "read_nonblocking", "setecho", "delaybeforesend"))
 class Controller(object):
     """Controller class which wraps the pyexpect.spawn class."""
@@ -27,11 +36,28 @@ class Controller(object):
         self.connected = False
         self.authenticated = False
         self.last_hop = 0
+        # the last FSM transitions recorded by condoor.fsm.FSM
+        self.trace = deque(maxlen=_C['fsm_trace_size']) if _C['fsm_trace_size'] else None
+        # the FSM statistics collected by condoor.fsm.FSM
+        self.stats = connection.fsm_stats if _C['fsm_stats'] else None
+        # the condoor.deadline.Deadline of the current operation limiting the expect timeouts
+        self.deadline = None
+        # the threading.Event set by the connection to cancel the current operation
+        self.cancel_event = None
+        # the number of the last received characters the last searcher needs to keep in the session buffer
+        self._lookback = None
 
     @property
     def hostname(self):
         return self._connection.hostname
 
+    def set_logfile(self, logfile):
+        """Set the session logfile used by the sessions spawned later and by the already spawned session."""
+        self._logfile_fd = logfile
+        if self._session is not None:
+            self._session.logfile_read = logfile
+            self._session.logfile_send = getattr(logfile, 'send_log', None)
+
     def spawn_session(self, command):
         """Spawn the session using proper command."""
         if self._session and self.isalive():  # pylint: disable=no-member
@@ -72,8 +98,171 @@ class Controller(object):
                 raise ConnectionTimeoutError("Timeout", self.hostname)
 
             self._session.logfile_read = self._logfile_fd
+            self._session.logfile_send = getattr(self._logfile_fd, 'send_log', None)
             self.connected = True
 
+    def spawn_telnet_session(self, hostname, port):
+        """Open the telnet session using the in-process telnet client.
+
+        If the session is already established the telnet command is executed on the current host instead.
+        """
+        if self._session and self.isalive():  # pylint: disable=no-member
+            self.spawn_session("telnet {} {}".format(hostname, port))
+            return
+
+        logger.debug("Opening telnet session to: {}:{}".format(hostname, port))
+        self._session = TelnetSpawn(hostname, port, maxread=50000, searchwindowsize=None, dimensions=(1024, 160))
+        self._session.logfile_read = self._logfile_fd
+        self._session.logfile_send = getattr(self._logfile_fd, 'send_log', None)
+        self.connected = True
+
+    def _limit_timeout(self, timeout):
+        """Return the timeout limited by the deadline and True if limited."""
+        if timeout == -1:
+            timeout = self._session.timeout
+        if self.deadline is None:
+            return timeout, False
+        if self.deadline.expired:
+            raise DeadlineExceededError("Deadline exceeded", self.hostname)
+        return self.deadline.limit(timeout)
+
+    def _check_cancelled(self):
+        """Raise ConnectionCancelledError if the operation is cancelled."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ConnectionCancelledError("Operation cancelled", self.hostname)
+
+    def _wait(self, searcher, timeout, searchwindowsize=-1):
+        """Run the expect loop with the searcher limiting the timeout by the deadline and checking the cancellation.
+
+        If the cancellation is enabled the wait is sliced into the `cancel_poll_interval` long expect loops.
+        The data received so far stays in the session buffer between the loops and is neither copied nor searched
+        again, so the slicing does not add to the wait time. Refer to :class:`_SlicedExpecter`.
+
+        Args:
+            searcher: The pexpect compatible searcher object.
+            timeout (float): The timeout in seconds, *None* for no timeout or -1 for the session default.
+            searchwindowsize (int): The pexpect search window size.
+
+        Returns:
+            int: The index of the matched pattern.
+        """
+        timeout, limited = self._limit_timeout(timeout)
+        self._check_cancelled()
+        interval = None if self.cancel_event is None else _C['cancel_poll_interval']
+        end = None if timeout is None else time() + timeout
+        expecter = _SlicedExpecter(self._session, searcher, searchwindowsize)
+
+        while True:
+            remaining = None if end is None else max(0, end - time())
+            expecter.last = last = interval is None or (remaining is not None and remaining <= interval)
+            if interval is not None:
+                timeout = remaining if last else interval
+
+            try:
+                index = expecter.expect_loop(timeout)
+            except pexpect.TIMEOUT:
+                if last:
+                    self._check_deadline(limited)
+                    raise
+            else:
+                if index != searcher.timeout_index:
+                    return index
+                if last:
+                    self._check_deadline(limited)
+                    return index
+
+            self._check_cancelled()
+            expecter.resumed = True
+
+    def _check_deadline(self, limited):
+        """Raise DeadlineExceededError if the timeout was limited by the deadline."""
+        if limited:
+            raise DeadlineExceededError("Deadline exceeded", self.hostname)
+
+    def expect(self, pattern, timeout=-1, searchwindowsize=-1):
+        """Wait for the pattern or list of patterns and return the index of the matched one.
+
+        The arguments are the same as for :meth:`pexpect.spawn.expect`. In the incremental search mode only the newly
+        received data plus the pattern window is searched, so the time of waiting for the prompt after the large
+        command output is linear to the output size. Refer to :class:`condoor.searcher.IncrementalSearcher`.
+
+        The timeout is limited to the time remaining to the deadline if set. Refer to
+        :class:`condoor.deadline.Deadline`.
+
+        Raises:
+            DeadlineExceededError: If the deadline passed.
+            ConnectionCancelledError: If the operation is cancelled.
+        """
+        compiled_pattern_list = self._session.compile_pattern_list(pattern)
+        if _C['search_mode'] != 'incremental':
+            searcher = pexpect.searcher_re(compiled_pattern_list)
+        else:
+            searcher = IncrementalSearcher(compiled_pattern_list, default_window=_C['search_window'],
+                                           combine=_C['search_combined'])
+            self._lookback = searcher.longest_string
+
+        return self._wait(searcher, timeout, searchwindowsize)
+
+    def expect_exact(self, pattern_list, timeout=-1, searchwindowsize=-1):
+        """Wait for the exact string or list of strings and return the index of the matched one.
+
+        The arguments are the same as for :meth:`pexpect.spawn.expect_exact`. The timeout is limited to the time
+        remaining to the deadline if set.
+
+        Raises:
+            DeadlineExceededError: If the deadline passed.
+            ConnectionCancelledError: If the operation is cancelled.
+        """
+        if not isinstance(pattern_list, list):
+            pattern_list = [pattern_list]
+
+        return self._wait(pexpect.searcher_string(pattern_list), timeout, searchwindowsize)
+
+    @contextmanager
+    def output_sink(self, sink):
+        """Pass the data received from the device to the sink for the time of the context.
+
+        The data already received but not matched yet is passed first. In the incremental search mode only the data
+        the searcher needs is kept in the session buffer, so the memory used does not depend on the output size and
+        the `before` attribute contains only the tail of the output.
+
+        Args:
+            sink (func): The function called with the received data as an argument.
+        """
+        tee = _SinkTee(self, sink, self._session.logfile_read)
+        if self._session.buffer:
+            sink(self._session.buffer)
+        self._session.logfile_read = tee
+        try:
+            yield
+        finally:
+            self._session.logfile_read = tee.logfile
+
+    def _trim_before(self):
+        """Drop the data not needed by the searcher from the session buffer keeping the text before the match.
+
+        It relies on the pexpect>=4.8 session keeping the text before the match in the `_before` buffer.
+        """
+        before = self._session._before  # pylint: disable=protected-access
+        if self._lookback is not None and before.tell() > self._lookback + _C['stream_buffer_size']:
+            tail = before.getvalue()[-self._lookback:]
+            self._session._before = self._session.buffer_type()  # pylint: disable=protected-access
+            self._session._before.write(tail)  # pylint: disable=protected-access
+
+    def dump_trace(self, log_level=logging.ERROR):
+        """Log the recorded FSM transitions and clear the trace."""
+        if not self.trace:
+            return
+
+        logger.log(log_level, "Last {} FSM transitions:".format(len(self.trace)))
+        for timestamp, name, event, state, next_state, act, expect_time in self.trace:
+            if isinstance(act, partial):
+                act = act.func
+            act = getattr(act, '__name__', repr(act))
+            logger.log(log_level, "{:.3f} {} E={},S={},NS={},A={},RT={:.2f}".format(
+                timestamp, name, event, state, next_state, act, expect_time))
+        self.trace.clear()
+
     def send_command(self, cmd):
         """Send command."""
         self.setecho(False)  # pylint: disable=no-member
@@ -109,6 +298,8 @@ class Controller(object):
 
         # maximum time for reading the entire prompt
         total_timeout = timeout_multiplier * 4
+        if self.deadline is not None:
+            total_timeout = min(total_timeout, self.deadline.remaining)
 
         prompt = ""
         begin = time()
@@ -170,7 +361,7 @@ class Controller(object):
                 logger.debug("Detected prompt: '{}'".format(prompt))
                 compiled_prompt = re.compile("(\r\n|\n\r){}".format(re.escape(prompt)))
                 self.sendline()  # pylint: disable=no-member
-                self.expect(compiled_prompt)  # pylint: disable=no-member
+                self.expect(compiled_prompt)
                 return prompt
 
         return None
@@ -189,3 +380,53 @@ class Controller(object):
     def after(self):
         """Return text that was matched by the expected pattern."""
         return self._session.after if self._session else None
+
+    @property
+    def buffer(self):
+        """Return text received after the expected pattern and not matched yet."""
+        return self._session.buffer if self._session else None
+
+
+class _SinkTee(object):
+    """File-like object set as the session logfile_read passing the data to the sink and the original logfile."""
+
+    def __init__(self, ctrl, sink, logfile):
+        self.ctrl = ctrl
+        self.sink = sink
+        self.logfile = logfile
+
+    def write(self, data):
+        # called by pexpect>=4.8 read_nonblocking for the data just read and not added to the buffers yet
+        self.ctrl._trim_before()  # pylint: disable=protected-access
+        self.sink(data)
+        if self.logfile:
+            self.logfile.write(data)
+
+    def flush(self):
+        if self.logfile:
+            self.logfile.flush()
+
+
+class _SlicedExpecter(Expecter):
+    """Pexpect expecter running the wait in the time slices without processing the buffered data in each slice.
+
+    The pexpect expect loop starts with copying the text received since the last match to the search buffer and
+    searching it, and ends with copying it to the `before` attribute on timeout. If the wait is resumed after the time
+    slice, no data was received since the previous slice found no match and the search buffer keeps the searcher
+    lookback already, so the copy and the search are skipped. The `before` attribute is set by the last slice only.
+    """
+
+    def __init__(self, spawn, searcher, searchwindowsize=-1):
+        super(_SlicedExpecter, self).__init__(spawn, searcher, searchwindowsize)
+        self.resumed = False
+        self.last = True
+
+    def existing_data(self):
+        if self.resumed:
+            return None
+        return super(_SlicedExpecter, self).existing_data()
+
+    def timeout(self, err=None):
+        if self.last:
+            return super(_SlicedExpecter, self).timeout(err)
+        raise pexpect.TIMEOUT("Time slice exceeded")
@@ -0,0 +1,64 @@
+"""Provides the Deadline class limiting the total time of the connection operation."""
+
+import time
+
+
+class Deadline(object):
+    """Deadline class representing the point in time the whole operation must finish by.
+
+    The deadline is passed to :meth:`condoor.Connection.connect`, :meth:`condoor.Connection.reconnect`,
+    :meth:`condoor.Connection.send` and :meth:`condoor.Connection.run_fsm`. Every `expect` run during the
+    operation waits for the minimum of the state timeout and the time remaining to the deadline and
+    :class:`condoor.DeadlineExceededError` is raised when the deadline passes. The single deadline can be shared by
+    the consecutive operations, i.e.::
+
+        deadline = Deadline(120)
+        conn.connect(deadline=deadline)
+        output = conn.send("show version", deadline=deadline)
+
+    """
+
+    __slots__ = ('expires',)
+
+    def __init__(self, timeout):
+        """Initialize the Deadline object.
+
+        Args:
+            timeout (float): The time in seconds from now to the deadline.
+        """
+        self.expires = time.time() + timeout
+
+    def __repr__(self):
+        """Return the string representing the deadline."""
+        return "Deadline(remaining={:.2f})".format(self.remaining)
+
+    @property
+    def remaining(self):
+        """Return the time in seconds remaining to the deadline or 0 if passed."""
+        return max(0.0, self.expires - time.time())
+
+    @property
+    def expired(self):
+        """Return True if the deadline passed."""
+        return time.time() >= self.expires
+
+    def limit(self, timeout):
+        """Return the timeout limited to the time remaining to the deadline.
+
+        Args:
+            timeout (float): The timeout in seconds or *None* for no timeout.
+
+        Returns:
+            tuple: The limited timeout and True if the timeout was limited by the deadline.
+        """
+        remaining = self.remaining
+        if timeout is None or remaining < timeout:
+            return remaining, True
+        return timeout, False
+
+
+def make_deadline(deadline):
+    """Return the Deadline object from the Deadline object, the timeout in seconds or *None*."""
+    if deadline is None or isinstance(deadline, Deadline):
+        return deadline
+    return Deadline(deadline)
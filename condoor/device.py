@@ -1,15 +1,43 @@
 """Provides Device class representing the physical device for both target and jumphost."""
 
 import sys
+import time
+import Queue
 import logging
+import hashlib
+import threading
+from collections import namedtuple
+
 import pexpect
 
-from condoor.exceptions import ConnectionError, CommandSyntaxError, CommandTimeoutError
+from condoor.exceptions import ConnectionError, CommandError, CommandSyntaxError, CommandTimeoutError, \
+    ConnectionCancelledError
 from condoor.utils import parse_inventory
 from condoor.fsm import FSM
+from condoor.config import CONF
+from condoor.output import CommandOutput
 
 logger = logging.getLogger(__name__)
 
+_C = CONF['connection']
+
+# send_iter queue item kinds
+_DATA, _DONE, _ERROR = range(3)
+
+
+class SendResult(namedtuple('SendResult', 'command size lines elapsed digest')):
+    """The result of the command which output was written to the sink.
+
+    Attributes:
+        command (str): The command sent.
+        size (int): The number of bytes written to the sink.
+        lines (int): The number of the output lines.
+        elapsed (float): Time in seconds from sending the command to receiving the prompt.
+        digest (str): The hex SHA-256 digest of the output written to the sink.
+    """
+
+    __slots__ = ()
+
 
 class Device(object):
     """Device class representing physical device for both target and jumphost."""
@@ -61,6 +89,8 @@ class Device(object):
         self.is_console = None
 
         self.last_command_result = None
+        # the exit status of the last command if completed on the end of output marker, otherwise None
+        self.last_exit_status = None
 
         self.last_error_msg = None
 
@@ -114,6 +144,7 @@ class Device(object):
             self.prompt_re = self.driver.prompt_re
 
         self.ctrl = ctrl
+        self.driver.clear_wait_fsm_cache()
         if self.protocol.connect(self.driver):
             if self.protocol.authenticate(self.driver):
                 self.ctrl.try_read_prompt(1)
@@ -180,7 +211,7 @@ class Device(object):
         self.ctrl = None
         self.protocol = None
 
-    def send(self, cmd="", timeout=60, wait_for_string=None):
+    def send(self, cmd="", timeout=60, wait_for_string=None, sink=None):
         """Send the command to the device and return the output.
 
         Args:
@@ -189,9 +220,12 @@ class Device(object):
             wait_for_string (str): This is optional string that driver
                 waits for after command execution. If none the detected
                 prompt will be used.
+            sink: Optional file-like object open for write or the function the command output is written to
+                as it is received instead of being returned.
 
         Returns:
-            A string containing the command output.
+            :class:`condoor.CommandOutput` string containing the command output or :class:`condoor.SendResult`
+            if the `sink` is passed.
 
         Raises:
             ConnectionError: General connection error during command execution
@@ -203,7 +237,10 @@ class Device(object):
             logger.debug("Sending command: '{}'".format(cmd))
 
             try:
-                output = self.execute_command(cmd, timeout, wait_for_string)
+                if sink is None:
+                    output = self.execute_command(cmd, timeout, wait_for_string)
+                else:
+                    output = self.execute_command_to_sink(cmd, timeout, wait_for_string, sink)
             except ConnectionError:
                 logger.error("Connection lost. Disconnecting.")
                 # self.disconnect()
@@ -219,44 +256,279 @@ class Device(object):
         """Execute command."""
         try:
             self.last_command_result = None
+            self.last_exit_status = None
+            if wait_for_string is None and self.prompt_re is not None:
+                marked = self.driver.completion_marker(cmd)
+                if marked is not None:
+                    return self._execute_marked(cmd, timeout, *marked)
+
+            start = time.time()
             self.ctrl.send_command(cmd)
-            if wait_for_string is None:
-                wait_for_string = self.prompt_re
+            return self._read_output(cmd, timeout, wait_for_string, start)
+
+        except Exception as e:  # pylint: disable=invalid-name
+            raise self._command_error(e, cmd)
+
+    def _execute_marked(self, cmd, timeout, marked_cmd, marker_re):
+        """Execute the command completing on the end of output marker and return the command output.
+
+        The marker is the literal text followed by the exit status, so the output containing the prompt like text
+        does not complete the command early. The prompt after the marker is consumed to keep the session in sync.
+        """
+        start = time.time()
+        self.ctrl.send_command(marked_cmd)
+        self._wait_for_marker(cmd, timeout, marker_re)
+        output = CommandOutput.from_raw(self.ctrl.before, cmd, time.time() - start, self.last_exit_status)
+        self._finish_marked()
+        return output
+
+    def _wait_for_marker(self, cmd, timeout, marker_re):
+        """Wait for the end of output marker and store the exit status."""
+        index = self.ctrl.expect([marker_re, pexpect.TIMEOUT, pexpect.EOF], timeout=timeout)
+        if index == 1:
+            raise CommandTimeoutError(message="Command timeout", host=self.hostname, command=cmd)
+        if index == 2:
+            raise pexpect.EOF("Session closed")
+
+        self.last_exit_status = int(marker_re.match(self.ctrl.after).group(1))
+
+    def _finish_marked(self):
+        """Consume the prompt after the end of output marker and check the exit status."""
+        self.ctrl.expect([self.prompt_re, pexpect.TIMEOUT], timeout=10)
+        if self.last_exit_status == 127:
+            raise CommandSyntaxError("Command unknown", self.hostname)
 
-            if not self.driver.wait_for_string(wait_for_string, timeout):
-                logger.error("Unexpected session disconnect during '{}' "
-                             "command execution".format(cmd))
-                raise ConnectionError("Unexpected session disconnect", host=self.hostname)
+    def _read_output(self, cmd, timeout, wait_for_string, start):
+        """Wait for the string after the command is sent at `start` time and return the command output."""
+        if wait_for_string is None:
+            wait_for_string = self.prompt_re
+
+        if not self.driver.wait_for_string(wait_for_string, timeout):
+            logger.error("Unexpected session disconnect during '{}' "
+                         "command execution".format(cmd))
+            raise ConnectionError("Unexpected session disconnect", host=self.hostname)
+
+        return CommandOutput.from_raw(self.last_command_result or self.ctrl.before, cmd, time.time() - start)
+
+    def send_many(self, cmds, timeout=60, window=None):
+        """Send the commands to the device writing up to `window` commands ahead and return the list of outputs.
+
+        The next command is written as soon as the prompt after the command `window` places before is received,
+        so the commands are not delayed by the round trip time. The received stream is split into the command
+        outputs on the command echo and the device prompt. The device must not page the output.
+
+        Args:
+            cmds (list): The list of the commands.
+            timeout (int): Timeout in seconds for each command. Defaults to 60s
+            window (int): The maximum number of the commands sent and not completed. Defaults to
+                `send_many_window`. The window 1 sends the commands the same as :meth:`send`.
+
+        Returns:
+            list: The list of the command outputs in the same order as the commands.
+
+        Raises:
+            ConnectionError: General connection error during command execution
+            CommandSyntaxError: Command syntax error or unknown command. The `command` attribute is the failed
+                command. The commands already written ahead are completed before the exception is raised.
+            CommandError: The command echo not received after the output of the previous command. The commands
+                already written ahead are completed before the exception is raised.
+            CommandTimeoutError: Timeout during command execution
+        """
+        if not self.connected:
+            raise ConnectionError("Device not connected", host=self.hostname)
+
+        cmds = list(cmds)
+        window = max(1, window or _C['send_many_window'])
+        outputs = []
+        sent_at = []
+        sent = 0
+        for index, cmd in enumerate(cmds):
+            try:
+                while sent < min(len(cmds), index + window):
+                    logger.debug("Sending command: '{}'".format(cmds[sent]))
+                    self.ctrl.sendline(cmds[sent])  # pylint: disable=no-member
+                    sent_at.append(time.time())
+                    sent += 1
+
+                self.last_command_result = None
+                self.last_exit_status = None
+                if self.ctrl.expect_exact([cmd, pexpect.TIMEOUT], timeout=15) == 1:  # pylint: disable=no-member
+                    # echoed in the middle of the previous command output, which is not reliable then
+                    raise CommandError("Command echo not received", self.hostname)
+                outputs.append(self._read_output(cmd, timeout, None, sent_at[index]))
+            except Exception as e:  # pylint: disable=invalid-name
+                error = self._command_error(e, cmd)
+                if isinstance(error, CommandError) and not isinstance(error, CommandTimeoutError):
+                    self._skip_prompts(sent - index, timeout)
+                raise error
 
-            if self.last_command_result:
-                output = self.last_command_result.replace('\r', '')
+            logger.info("Command executed successfully: '{}'".format(cmd))
+        return outputs
+
+    def _skip_prompts(self, count, timeout):
+        """Wait for the prompts after the commands already written to keep the session in sync."""
+        for _ in range(count):
+            if self.ctrl.expect([self.prompt_re, pexpect.TIMEOUT], timeout=timeout) != 0:
+                logger.error("Timeout waiting for the prompt after the command written ahead")
+                return
+
+    def execute_command_to_sink(self, cmd, timeout, wait_for_string, sink):
+        """Execute command writing the output to the sink as it is received.
+
+        The output written is the same as returned by :meth:`execute_command` including the commands completed on
+        the end of output marker. Only the command result extracted by the driver from the output of the other
+        command (`last_command_result`) is not known before the whole output is received, so the whole output is
+        written instead.
+        """
+        marked = None
+        if wait_for_string is None and self.prompt_re is not None:
+            marked = self.driver.completion_marker(cmd)
+
+        writer = _SinkWriter(sink)
+        lines = _OutputLines(self.driver.more_re, _C['stream_buffer_size'], marked[1] if marked else None)
+
+        def received(data):
+            for line, complete in lines.feed(data):
+                writer.write(line + '\n' if complete else line)
+
+        try:
+            self.last_command_result = None
+            self.last_exit_status = None
+            start = time.time()
+            if marked is not None:
+                self.ctrl.send_command(marked[0])
+                with self.ctrl.output_sink(received):
+                    self._wait_for_marker(cmd, timeout, marked[1])
             else:
-                output = self.ctrl.before.replace('\r', '')
+                self.ctrl.send_command(cmd)
+                if wait_for_string is None:
+                    wait_for_string = self.prompt_re
+
+                with self.ctrl.output_sink(received):
+                    if not self.driver.wait_for_string(wait_for_string, timeout):
+                        logger.error("Unexpected session disconnect during '{}' "
+                                     "command execution".format(cmd))
+                        raise ConnectionError("Unexpected session disconnect", host=self.hostname)
+
+            for line, _ in lines.finish(len(self.ctrl.after) + len(self.ctrl.buffer)):
+                writer.write(line)
+            result = writer.result(cmd, time.time() - start)
+            if marked is not None:
+                self._finish_marked()
+            return result
 
-            second_line_index = output.find('\n') + 1
-            output = output[second_line_index:]
-            return output
+        except Exception as e:  # pylint: disable=invalid-name
+            raise self._command_error(e, cmd)
 
-        except CommandSyntaxError as e:  # pylint: disable=invalid-name
-            logger.error("{}: '{}'".format(e.message, cmd))
-            e.command = cmd
-            raise
+    def _command_error(self, error, cmd):
+        """Log the command execution error and return the exception to be raised."""
+        if isinstance(error, CommandSyntaxError):
+            logger.error("{}: '{}'".format(error.message, cmd))
+            error.command = cmd
+            return error
 
-        except (CommandTimeoutError, pexpect.TIMEOUT):
+        if isinstance(error, (CommandTimeoutError, pexpect.TIMEOUT)):
             logger.error("Command timeout: '{}'".format(cmd))
-            raise CommandTimeoutError(message="Command timeout", host=self.hostname, command=cmd)
+            return CommandTimeoutError(message="Command timeout", host=self.hostname, command=cmd)
+
+        if isinstance(error, CommandError):
+            logger.error("{}: '{}'".format(error.message, cmd))
+            error.command = cmd
+            return error
 
-        except ConnectionError as e:  # pylint: disable=invalid-name
-            logger.error("{}: '{}'".format(e.message, cmd))
-            raise
+        if isinstance(error, ConnectionError):
+            logger.error("{}: '{}'".format(error.message, cmd))
+            return error
 
-        except pexpect.EOF:
+        if isinstance(error, pexpect.EOF):
             logger.error("Unexpected session disconnect")
-            raise ConnectionError("Unexpected session disconnect", host=self.hostname)
+            return ConnectionError("Unexpected session disconnect", host=self.hostname)
 
-        except Exception as e:  # pylint: disable=invalid-name
-            logger.critical("Exception", exc_info=True)
-            raise ConnectionError(message="Unexpected error", host=self.hostname)
+        logger.critical("Exception", exc_info=sys.exc_info()[0] is not None)
+        return ConnectionError(message="Unexpected error", host=self.hostname)
+
+    def send_iter(self, cmd="", timeout=60, wait_for_string=None):
+        """Send the command to the device and yield the output lines as they are received.
+
+        The lines are the same as returned by :meth:`send` split on the line ends. The lines longer than
+        `stream_buffer_size` are yielded in pieces. The driver FSM waiting for the prompt runs in the separate
+        thread and the received data is passed through the bounded queue, so the memory used does not depend on
+        the output size. If the generator is closed before the prompt is received the FSM is stopped with
+        :class:`condoor.ConnectionCancelledError` and the session is left in the middle of the output.
+
+        Raises:
+            ConnectionError: General connection error during command execution
+            CommandSyntaxError: Command syntax error or unknown command.
+            CommandTimeoutError: Timeout during command execution
+        """
+        if not self.connected:
+            raise ConnectionError("Device not connected", host=self.hostname)
+
+        logger.debug("Sending command: '{}'".format(cmd))
+        if wait_for_string is None:
+            wait_for_string = self.prompt_re
+
+        chunks = Queue.Queue(_C['stream_queue_size'])
+        stop = threading.Event()
+
+        def put(item):
+            """Put the item into the queue waiting for the consumer until stopped."""
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return
+                except Queue.Full:
+                    pass
+            raise ConnectionCancelledError("Output iteration stopped", self.hostname)
+
+        def produce():
+            """Run the FSM waiting for the prompt passing the received data to the queue."""
+            try:
+                self.ctrl.send_command(cmd)
+                with self.ctrl.output_sink(lambda data: put((_DATA, data))):
+                    if not self.driver.wait_for_string(wait_for_string, timeout):
+                        raise ConnectionError("Unexpected session disconnect", host=self.hostname)
+                # the length of the stream tail starting from the prompt
+                put((_DONE, len(self.ctrl.after) + len(self.ctrl.buffer)))
+            except Exception as e:  # pylint: disable=invalid-name,broad-except
+                try:
+                    put((_ERROR, e))
+                except ConnectionCancelledError:
+                    pass
+
+        # the FSM in the producer thread is stopped with the local event
+        # and the consumer checks the event set by the connection
+        cancel_event, self.ctrl.cancel_event = self.ctrl.cancel_event, stop
+        thread = threading.Thread(target=produce, name="send-iter-{}".format(self.hostname))
+        thread.daemon = True
+        thread.start()
+
+        lines = _OutputLines(self.driver.more_re, _C['stream_buffer_size'])
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ConnectionCancelledError("Operation cancelled", self.hostname)
+                try:
+                    kind, value = chunks.get(timeout=0.5)
+                except Queue.Empty:
+                    if thread.is_alive() or not chunks.empty():
+                        continue
+                    raise ConnectionError(message="Unexpected error", host=self.hostname)
+
+                if kind == _DATA:
+                    for line, _ in lines.feed(value):
+                        yield line
+                elif kind == _DONE:
+                    for line, _ in lines.finish(value):
+                        yield line
+                    logger.info("Command executed successfully: '{}'".format(cmd))
+                    return
+                else:
+                    raise self._command_error(value, cmd)
+        finally:
+            stop.set()
+            thread.join()
+            self.ctrl.cancel_event = cancel_event
 
     @property
     def driver_name(self):
@@ -429,3 +701,96 @@ class Device(object):
         """Wrap the FSM code."""
         self.ctrl.send_command(command)
         return FSM(name, self, events, transitions, timeout=timeout, max_transitions=max_transitions).run()
+
+
+class _OutputLines(object):
+    """Split the streamed command output into the lines the same as returned by :meth:`Device.send`.
+
+    The first line is the rest of the command echo and is skipped. The carriage returns and the more prompts are
+    removed. The incomplete last line is kept until the line end or the prompt is received. The lines are yielded
+    as (line, complete) tuples where `complete` is False for the pieces of the line longer than `max_line` and the
+    text before the prompt. If the `end_re` pattern is passed, i.e. the end of output marker, the text starting
+    from the match is dropped.
+    """
+
+    def __init__(self, more_re, max_line, end_re=None):
+        self.more_re = more_re
+        self.max_line = max_line
+        self.end_re = end_re
+        self._partial = ""
+        self._first = True
+        self._ended = False
+
+    def _normalize(self, line):
+        line = line.replace('\r', '')
+        return self.more_re.sub('', line) if self.more_re else line
+
+    def _cut(self, line):
+        """Keep the text before the end pattern as the last line and return True if the pattern is found."""
+        match = self.end_re.search(line) if self.end_re else None
+        if match is None:
+            return False
+        self._partial = line[:match.start()]
+        self._ended = True
+        return True
+
+    def feed(self, data):
+        """Yield the complete lines."""
+        if self._ended:
+            return
+
+        lines = (self._partial + data).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            if self._first:
+                self._first = False
+                continue
+            if self._cut(line):
+                return
+            yield self._normalize(line), True
+
+        if self._first or self._cut(self._partial):
+            return
+
+        if len(self._partial) > 2 * self.max_line:
+            yield self._normalize(self._partial[:-self.max_line]), False
+            self._partial = self._partial[-self.max_line:]
+
+    def finish(self, tail_size):
+        """Yield the text received before the prompt in the last line.
+
+        Args:
+            tail_size (int): The number of the last characters received starting from the prompt. Not used if the
+                text was cut at the end pattern.
+        """
+        if self._ended:
+            text = self._partial
+        else:
+            text = self._partial[:len(self._partial) - tail_size] if tail_size < len(self._partial) else ""
+        if text:
+            yield self._normalize(text), False
+
+
+class _SinkWriter(object):
+    """Write the command output to the file-like object or the function counting the bytes, lines and digest."""
+
+    def __init__(self, sink):
+        self._write = sink.write if hasattr(sink, 'write') else sink
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.lines = 0
+        self._last = '\n'
+
+    def write(self, text):
+        if not text:
+            return
+        self._write(text)
+        self._digest.update(text)
+        self.size += len(text)
+        self.lines += text.count('\n')
+        self._last = text[-1]
+
+    def result(self, cmd, elapsed):
+        """Return the SendResult object."""
+        lines = self.lines if self._last == '\n' else self.lines + 1
+        return SendResult(cmd, self.size, lines, elapsed, self._digest.hexdigest())
@@ -67,8 +67,8 @@ class Driver(Generic):
             logger.debug('No update: {}'.format(self.platform))
             return self.platform
 
-    def wait_for_string(self, expected_string, timeout=60):
-        """Wait for string FSM for XR 64 bit."""
+    def make_wait_for_string_fsm(self, expected_string, previous_prompts):
+        """Return the wait for string FSM for XR 64 bit."""
         # Big thanks to calvados developers for make this FSM such complex ;-)
         #                    0                         1                        2                        3
         events = [self.syntax_error_re, self.connection_closed_re, expected_string, self.press_return_re,
@@ -78,9 +78,8 @@ class Driver(Generic):
                   self.calvados_term_length]
 
         # add detected prompts chain
-        events += self.device.get_previous_prompts()  # without target prompt
+        events += previous_prompts
 
-        logger.debug("Expecting: {}".format(pattern_to_str(expected_string)))
         logger.debug("Calvados prompt: {}".format(pattern_to_str(self.calvados_re)))
 
         transitions = [
@@ -105,11 +104,10 @@ class Driver(Generic):
             (self.calvados_re, [5], 0, a_store_cmd_result, 0),
         ]
 
-        for prompt in self.device.get_previous_prompts():
+        for prompt in previous_prompts:
             transitions.append((prompt, [0, 1], 0, a_unexpected_prompt, 0))
 
-        fsm = FSM("WAIT-4-STRING", self.device, events, transitions, timeout=timeout)
-        return fsm.run()
+        return FSM("WAIT-4-STRING", self.device, events, transitions)
 
     def reload(self, reload_timeout, save_config):
 
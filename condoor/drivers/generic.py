@@ -1,6 +1,7 @@
 """This is generic driver class implementation."""
 
 from functools import partial
+from collections import OrderedDict
 import re
 import logging
 import pexpect
@@ -14,6 +15,9 @@ from condoor import pattern_manager
 
 logger = logging.getLogger(__name__)
 
+# The maximum number of the WAIT-4-STRING state machines cached per driver
+WAIT_FSM_CACHE_SIZE = 16
+
 
 class Driver(object):
     """This is generic Driver class implementation."""
@@ -51,6 +55,9 @@ class Driver(object):
         self.vty_re = pattern_manager.pattern(self.platform, 'vty')
         self.console_re = pattern_manager.pattern(self.platform, 'console')
 
+        # (controller, hostname, expected string, previous prompts) -> FSM
+        self._wait_fsm_cache = OrderedDict()
+
     def __repr__(self):
         """Return the string representation of the driver class."""
         return str(self.platform)
@@ -188,16 +195,44 @@ class Driver(object):
             return self.platform
 
     def wait_for_string(self, expected_string, timeout=60):
-        """Wait for string FSM."""
+        """Wait for string FSM.
+
+        The state machine is built once for the expected string and the previous prompts and reused for the
+        subsequent commands. The new state machine is built when the prompt or hostname changes. The cache is
+        cleared by :meth:`clear_wait_fsm_cache` every time the device is connected or reconnected.
+        """
+        previous_prompts = tuple(self.device.get_previous_prompts())  # without target prompt
+        key = (self.device.ctrl, self.device.hostname, expected_string, previous_prompts)
+        fsm = self._wait_fsm_cache.pop(key, None)
+        if fsm is None:
+            fsm = self.make_wait_for_string_fsm(expected_string, list(previous_prompts))
+            if len(self._wait_fsm_cache) >= WAIT_FSM_CACHE_SIZE:
+                self._wait_fsm_cache.popitem(last=False)
+        self._wait_fsm_cache[key] = fsm
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Expecting: {}".format(pattern_to_str(expected_string)))
+        fsm.timeout = timeout
+        return fsm.run()
+
+    def clear_wait_fsm_cache(self):
+        """Drop the cached WAIT-4-STRING state machines."""
+        self._wait_fsm_cache.clear()
+
+    def make_wait_for_string_fsm(self, expected_string, previous_prompts):
+        """Return the wait for string FSM.
+
+        Args:
+            expected_string (str): The expected string or compiled pattern.
+            previous_prompts (list): The prompts of the devices in the chain before the target device.
+        """
         #                    0                         1                        2                        3
         events = [self.syntax_error_re, self.connection_closed_re, expected_string, self.press_return_re,
                   #        4           5                 6                7
                   self.more_re, pexpect.TIMEOUT, pexpect.EOF, self.buffer_overflow_re]
 
         # add detected prompts chain
-        events += self.device.get_previous_prompts()  # without target prompt
-
-        logger.debug("Expecting: {}".format(pattern_to_str(expected_string)))
+        events += previous_prompts
 
         transitions = [
             (self.syntax_error_re, [0], -1, CommandSyntaxError("Command unknown", self.device.hostname), 0),
@@ -211,11 +246,10 @@ class Driver(object):
             (self.buffer_overflow_re, [0], -1, CommandSyntaxError("Command too long", self.device.hostname), 0)
         ]
 
-        for prompt in self.device.get_previous_prompts():
+        for prompt in previous_prompts:
             transitions.append((prompt, [0, 1], 0, a_unexpected_prompt, 0))
 
-        fsm = FSM("WAIT-4-STRING", self.device, events, transitions, timeout=timeout)
-        return fsm.run()
+        return FSM("WAIT-4-STRING", self.device, events, transitions)
 
     # def send_xml(self, command, timeout=60):
     #     """
@@ -251,6 +285,15 @@ class Driver(object):
     #     self.send()
     #     return result
 
+    def completion_marker(self, cmd):  # pylint: disable=no-self-use,unused-argument
+        """Return the command printing the end of output marker and the marker pattern.
+
+        The driver supporting the marker based command completion returns the tuple of the command followed by the
+        command printing the unique marker with the exit status and the compiled pattern matching the marker with the
+        exit status as the first group. The generic driver returns *None* and the command completes on the prompt.
+        """
+        return None
+
     def enable(self, enable_password):
         """Change the device mode to privileged.
 
@@ -1,13 +1,22 @@
 """This is jumphost driver class implementation."""
 
 import re
+import random
 import logging
 
 from condoor.drivers.generic import Driver as Generic
 from condoor import pattern_manager, CommandError
+from condoor.config import CONF
 
 logger = logging.getLogger(__name__)
 
+_C = CONF['driver']['jumphost']
+
+# The marker is printed with the random token as a separate argument, so the command echo never matches it
+MARKER = "__CONDOOR_DONE_"
+# The command ending with any of these can not be followed by the marker command
+UNSAFE_ENDINGS = ('&', '|', ';', '\\')
+
 
 class Driver(Generic):
     """This is a Driver class implementation for Unix Jumphost."""
@@ -41,6 +50,35 @@ class Driver(Generic):
         except CommandError:
             return None
 
+    def completion_marker(self, cmd):
+        """Return the command printing the end of output marker and the marker pattern if enabled.
+
+        The marker command is appended after the semicolon and prints the `$?` exit status, which requires the POSIX
+        shell on the jumphost. *None* is returned, so the command completes on the prompt, for the commands which can
+        not be safely followed by the marker command and for the csh like prompt.
+        """
+        if not _C['completion_marker']:
+            return None
+
+        if not self._can_mark(cmd):
+            logger.debug("Command '{}' completes on the prompt instead of the marker".format(cmd))
+            return None
+
+        token = "{:08x}".format(random.getrandbits(32))
+        marked_cmd = "{}; printf '{}%s:%d__' {} $?".format(cmd, MARKER, token)
+        return marked_cmd, re.compile(re.escape("{}{}:".format(MARKER, token)) + r"(\d+)__")
+
+    def _can_mark(self, cmd):
+        """Return True if the marker command can be appended to the command.
+
+        The empty, multiline, background and continued commands and the commands which may contain the comment
+        are not marked. The prompt ending with '%' is the csh or tcsh one.
+        """
+        stripped = cmd.strip()
+        if not stripped or '\n' in stripped or '#' in stripped or stripped.endswith(UNSAFE_ENDINGS):
+            return False
+        return not (self.device.prompt or '').rstrip().endswith('%')
+
     def make_dynamic_prompt(self, prompt):
         """Extend prompt with flexible mode handling regexp."""
         patterns = [pattern_manager.pattern(
@@ -84,3 +84,15 @@ class CommandTimeoutError(CommandError):
     """Command timeout error."""
 
     pass
+
+
+class DeadlineExceededError(ConnectionTimeoutError):
+    """Deadline exceeded."""
+
+    pass
+
+
+class ConnectionCancelledError(ConnectionError):
+    """Operation cancelled."""
+
+    pass
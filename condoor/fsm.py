@@ -1,26 +1,44 @@
 """Provides Finite State Machine implementation."""
 
+from copy import copy
 from inspect import isclass
 from functools import wraps
 import logging
 from time import time
 
-from pexpect import EOF
+from pexpect import EOF, TIMEOUT
 from condoor.exceptions import ConnectionError
 from condoor.utils import pattern_to_str
 
 logger = logging.getLogger(__name__)
 
+# The kinds of the transition actions classified when compiling the FSM
+ACTION_CALL, ACTION_RAISE, ACTION_NONE, ACTION_INVALID = range(4)
+
+
+def _action_kind(act):
+    if callable(act) and not isclass(act):
+        return ACTION_CALL
+    elif isinstance(act, Exception):
+        return ACTION_RAISE
+    elif act is None:
+        return ACTION_NONE
+    return ACTION_INVALID
+
+
+def _event_to_str(event):
+    return event.__name__ if isclass(event) else pattern_to_str(event)
+
 
 def action(func):
     """Wrapper for FSM action function providing extended logging information based on doc string."""
+    name = func.__name__ if func.__doc__ is None else func.__doc__.split('\n', 1)[0]
+
     @wraps(func)
     def call_action(*args, **kwargs):
         """Wrap the function with logger debug."""
-        if func.__doc__ is None:
-            logger.debug("A={}".format(func.__name__))
-        else:
-            logger.debug("A={}".format(func.__doc__.split('\n', 1)[0]))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("A={}".format(name))
         return func(*args, **kwargs)
     return call_action
 
@@ -120,10 +138,19 @@ class FSM(object):
         self.init_pattern = init_pattern
         self.max_transitions = max_transitions
 
-        self.transition_table = self._compile(transitions, events)
+        self.n_states, self.transition_table = self._compile(transitions, events)
+        if logger.isEnabledFor(logging.DEBUG):
+            for problem in self.validate():
+                logger.debug("{}: {}".format(self.name, problem))
 
     def _compile(self, transitions, events):
-        compiled = {}
+        """Return the number of states and the transition table.
+
+        The transition table is the flat list of `len(events) * n_states` items indexed with
+        `event_index * n_states + state`. The item is *None* if there is no transition for the event in the state
+        or the tuple (next_state, action_kind, action, timeout).
+        """
+        compiled = []
         for transition in transitions:
             event, states, new_state, act, timeout = transition
             if not isinstance(states, list):
@@ -134,22 +161,82 @@ class FSM(object):
                 logger.debug("Transition for non-existing event: {}".format(
                     event if isinstance(event, str) else event.pattern))
             else:
-                for state in states:
-                    key = (event_index, state)
-                    compiled[key] = (new_state, act, timeout)
+                compiled.append((event_index, states, (new_state, _action_kind(act), act, timeout)))
+
+        n_states = max([state + 1 for _, states, _ in compiled for state in states] +
+                       [entry[0] + 1 for _, _, entry in compiled] + [1])
+        table = [None] * (len(events) * n_states)
+        for event_index, states, entry in compiled:
+            for state in states:
+                table[event_index * n_states + state] = entry
 
-        return compiled
+        return n_states, table
+
+    def validate(self):
+        """Return the list of the FSM definition problems.
+
+        The problems reported are the states not reachable from the initial state and the events without
+        any transition.
+        """
+        problems = []
+        n_events = len(self.events)
+        reachable = set()
+        pending = [0]
+        while pending:
+            state = pending.pop()
+            if state in reachable or not 0 <= state < self.n_states:
+                continue
+            reachable.add(state)
+            for event_index in range(n_events):
+                entry = self.transition_table[event_index * self.n_states + state]
+                if entry is not None:
+                    pending.append(entry[0])
+
+        for state in range(self.n_states):
+            defined = any(self.transition_table[event_index * self.n_states + state] is not None
+                          for event_index in range(n_events))
+            if defined and state not in reachable:
+                problems.append("Unreachable state: {}".format(state))
+
+        for event_index in range(n_events):
+            if all(entry is None for entry in
+                   self.transition_table[event_index * self.n_states:(event_index + 1) * self.n_states]):
+                problems.append("Event without transition: {}".format(_event_to_str(self.events[event_index])))
+
+        return problems
 
     def run(self):
         """Start the FSM.
 
+        If the controller keeps the trace, each transition is recorded as the tuple (timestamp, fsm name, event,
+        state, next state, action, expect time) and the trace is dumped to the log if the FSM fails. If the
+        controller keeps the statistics, the transitions and timings are recorded. Refer to
+        :class:`condoor.stats.FSMStats`.
+
         Returns:
             boolean: True if FSM reaches the last state or false if the exception or error message was raised
         """
+        trace = getattr(self.ctrl, 'trace', None)
+        try:
+            result = self._run(trace)
+        except Exception:
+            if trace is not None:
+                self.ctrl.dump_trace()
+            raise
+        if not result and trace is not None:
+            self.ctrl.dump_trace()
+        return result
+
+    def _run(self, trace):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        stats = getattr(self.ctrl, 'stats', None)
+        if stats is not None:
+            stats.record_run(self.name)
         ctx = FSM.Context(self.name, self.device)
         transition_counter = 0
         timeout = self.timeout
-        logger.debug("{} Start".format(self.name))
+        if debug:
+            logger.debug("{} Start".format(self.name))
         while transition_counter < self.max_transitions:
             transition_counter += 1
             try:
@@ -157,7 +244,8 @@ class FSM(object):
                 if self.init_pattern is None:
                     ctx.event = self.ctrl.expect(self.events, searchwindowsize=self.searchwindowsize, timeout=timeout)
                 else:
-                    logger.debug("INIT_PATTERN={}".format(pattern_to_str(self.init_pattern)))
+                    if debug:
+                        logger.debug("INIT_PATTERN={}".format(pattern_to_str(self.init_pattern)))
                     try:
                         ctx.event = self.events.index(self.init_pattern)
                     except ValueError:
@@ -167,22 +255,38 @@ class FSM(object):
                         self.init_pattern = None
 
                 finish_time = time() - start_time
-                key = (ctx.event, ctx.state)
                 ctx.pattern = self.events[ctx.event]
-
-                if key in self.transition_table:
-                    transition = self.transition_table[key]
-                    next_state, action_instance, next_timeout = transition
-                    logger.debug("E={},S={},T={},RT={:.2f}".format(ctx.event, ctx.state, timeout, finish_time))
-                    if callable(action_instance) and not isclass(action_instance):
-                        if not action_instance(ctx):
+                if stats is not None:
+                    stats.record_transition(self.name, ctx.state, _event_to_str(ctx.pattern), finish_time,
+                                            ctx.pattern is TIMEOUT)
+
+                transition = None
+                if 0 <= ctx.state < self.n_states:
+                    transition = self.transition_table[ctx.event * self.n_states + ctx.state]
+
+                if transition is not None:
+                    next_state, action_kind, action_instance, next_timeout = transition
+                    if trace is not None:
+                        trace.append((start_time, self.name, ctx.event, ctx.state, next_state, action_instance,
+                                      finish_time))
+                    if debug:
+                        logger.debug("E={},S={},T={},RT={:.2f}".format(ctx.event, ctx.state, timeout, finish_time))
+                    if action_kind == ACTION_CALL:
+                        action_start = time()
+                        result = action_instance(ctx)
+                        if stats is not None:
+                            stats.record_action(self.name, time() - action_start)
+                        if not result:
                             logger.error("Error: {}".format(ctx.msg))
                             return False
-                    elif isinstance(action_instance, Exception):
-                        logger.debug("A=Exception {}".format(action_instance))
-                        raise action_instance
-                    elif action_instance is None:
-                        logger.debug("A=None")
+                    elif action_kind == ACTION_RAISE:
+                        if debug:
+                            logger.debug("A=Exception {}".format(action_instance))
+                        # a new instance per run, the callers annotate the raised exception
+                        raise copy(action_instance)
+                    elif action_kind == ACTION_NONE:
+                        if debug:
+                            logger.debug("A=None")
                     else:
                         logger.error("FSM Action is not callable: {}".format(str(action_instance)))
                         raise RuntimeWarning("FSM Action is not callable")
@@ -190,9 +294,12 @@ class FSM(object):
                     if next_timeout != 0:  # no change if set to 0
                         timeout = next_timeout
                     ctx.state = next_state
-                    logger.debug("NS={},NT={}".format(next_state, timeout))
+                    if debug:
+                        logger.debug("NS={},NT={}".format(next_state, timeout))
 
                 else:
+                    if trace is not None:
+                        trace.append((start_time, self.name, ctx.event, ctx.state, None, None, finish_time))
                     logger.warning("Unknown transition: EVENT={},STATE={}".format(ctx.event, ctx.state))
                     continue
 
@@ -200,9 +307,12 @@ class FSM(object):
                 raise ConnectionError("Session closed unexpectedly", self.ctrl.hostname)
 
             if ctx.finished or next_state == -1:
-                logger.debug("{} Stop at E={},S={}".format(self.name, ctx.event, ctx.state))
+                if debug:
+                    logger.debug("{} Stop at E={},S={}".format(self.name, ctx.event, ctx.state))
                 return True
 
         # check while else if even exists
+        if stats is not None:
+            stats.record_exhausted(self.name)
         logger.error("FSM looped. Exiting")
         return False
@@ -4,6 +4,7 @@ import re
 from urlparse import urlparse
 
 from condoor.exceptions import InvalidHopInfoError
+from condoor import utils
 
 # Standard protocol to port mapping
 protocol2port_map = {
@@ -112,14 +113,41 @@ class HopInfo(object):
             return False
         return True
 
+    def _can_verify(self):
+        return self.verify_reachability and hasattr(self.verify_reachability, '__call__')
+
     def is_reachable(self):
         """Return if host is reachable."""
-        if self.verify_reachability and \
-                hasattr(self.verify_reachability, '__call__'):
+        if self._can_verify():
             return self.verify_reachability(host=self.hostname, port=self.port)
         # assume is reachable if can't verify
         return True
 
+    def check_reachability(self, timeout=2):
+        """Return True if the hop is reachable.
+
+        The `verify_reachability` callable is used if provided, otherwise the TCP connection to the hop port is
+        attempted within `timeout` seconds. Refer to :func:`condoor.utils.is_reachable`.
+        """
+        if self._can_verify():
+            return self.is_reachable()
+        return utils.is_reachable(self.hostname, self.port, timeout=timeout)
+
+    def _key(self):
+        return self.protocol, self.hostname, self.port, self.username, self.password, self.enable_password
+
+    def __eq__(self, other):
+        """Return True if both objects describe the same hop including the credentials."""
+        return isinstance(other, HopInfo) and self._key() == other._key()  # pylint: disable=protected-access
+
+    def __ne__(self, other):
+        """Return True if objects describe different hops."""
+        return not self == other
+
+    def __hash__(self):
+        """Return the hash allowing to use the object as a dictionary key."""
+        return hash(self._key())
+
     def __repr__(self):
         """Return string representation of the class."""
         if self.username is None:
@@ -0,0 +1,193 @@
+"""Provides the SSH control master helpers and the JumphostManager class keeping the jumphost master sessions."""
+
+import os
+import re
+import time
+import errno
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from hashlib import md5
+
+import pexpect
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = re.compile("[P|p]assword:\s?")
+PERMISSION_DENIED = re.compile("Permission denied")
+
+
+def make_control_path(hop_info, directory):
+    """Return the control socket path for the host in the directory.
+
+    The socket name is a short hash of the username, hostname and port to stay within the unix socket path length
+    limit. The directory is created with the owner only permissions if it does not exist.
+    """
+    directory = os.path.expanduser(directory)
+    try:
+        os.makedirs(directory, 0o700)
+    except OSError as e:  # pylint: disable=invalid-name
+        if e.errno != errno.EEXIST:
+            raise
+    key = md5(repr((hop_info.username, hop_info.hostname, hop_info.port))).hexdigest()[:16]
+    return os.path.join(directory, key)
+
+
+def check_control_master(control_path, hop_info):
+    """Return True if the control master listening on the control socket is alive.
+
+    The stale control socket left by the master which did not exit cleanly is removed.
+    """
+    if not os.path.exists(control_path):
+        return False
+
+    with open(os.devnull, "w") as devnull:
+        result = subprocess.call(["ssh", "-O", "check", "-o", "ControlPath={}".format(control_path),
+                                  "-p", str(hop_info.port), hop_info.hostname], stdout=devnull, stderr=devnull)
+    if result == 0:
+        logger.debug("Control master for {} alive: {}".format(hop_info, control_path))
+        return True
+
+    logger.debug("Removing stale control socket for {}: {}".format(hop_info, control_path))
+    try:
+        os.remove(control_path)
+    except OSError:
+        pass
+    return False
+
+
+class JumphostManager(object):
+    """JumphostManager class keeping one authenticated master session per jumphost.
+
+    The master session is the OpenSSH control master (ssh -M) authenticated once with the credentials from
+    :class:`condoor.hopinfo.HopInfo`. The subsequent SSH connections to the same jumphost open the new channel
+    within the master session using the control socket. The channel setup requires neither the new TCP
+    connection nor the authentication, so the jumphost sees a single login regardless the number of the target
+    devices reached through it.
+    """
+
+    def __init__(self):
+        """Initialize the JumphostManager object."""
+        self._lock = threading.Lock()
+        self._hop_locks = {}
+        self._masters = {}
+        self._socket_dir = None
+
+    @property
+    def socket_dir(self):
+        """Return the directory for the control sockets. The directory is created on first use."""
+        if self._socket_dir is None:
+            self._socket_dir = tempfile.mkdtemp(prefix="condoor-")
+            logger.debug("Control socket directory: {}".format(self._socket_dir))
+        return self._socket_dir
+
+    def control_path(self, hop_info):
+        """Return the control socket path for the jumphost."""
+        return make_control_path(hop_info, self.socket_dir)
+
+    def _hop_lock(self, hop_info):
+        with self._lock:
+            return self._hop_locks.setdefault(hop_info, threading.Lock())
+
+    def is_alive(self, hop_info):
+        """Return True if the master session for the jumphost is alive."""
+        session = self._masters.get(hop_info)
+        return session is not None and session.isalive() and os.path.exists(self.control_path(hop_info))
+
+    def acquire(self, hop_info, timeout=60):
+        """Return the control socket path of the master session for the jumphost.
+
+        The master session is started and authenticated if not alive. The concurrent calls for the same jumphost
+        wait for the single master session to be established.
+
+        Args:
+            hop_info (HopInfo): The jumphost information.
+            timeout (int): The time in seconds to wait for the master session to be authenticated.
+
+        Returns:
+            str: The control socket path or *None* if the master session could not be established.
+        """
+        with self._hop_lock(hop_info):
+            if self.is_alive(hop_info):
+                return self.control_path(hop_info)
+
+            self._close_master(hop_info)
+            session = self._start_master(hop_info, timeout)
+            if session is None:
+                return None
+
+            self._masters[hop_info] = session
+            return self.control_path(hop_info)
+
+    def _start_master(self, hop_info, timeout):
+        control_path = self.control_path(hop_info)
+        command = "ssh " \
+                  "-o UserKnownHostsFile=/dev/null " \
+                  "-o StrictHostKeyChecking=no " \
+                  "-o ControlMaster=yes " \
+                  "-o ControlPath={} " \
+                  "-N -p {} {}{}".format(control_path, hop_info.port,
+                                         "{}@".format(hop_info.username) if hop_info.username else "",
+                                         hop_info.hostname)
+
+        logger.debug("Starting master session: '{}'".format(command))
+        try:
+            session = pexpect.spawn(command, env={"TERM": "VT100"})
+        except pexpect.ExceptionPexpect as e:  # pylint: disable=invalid-name
+            logger.error("Unable to start master session to {}: {}".format(hop_info, e))
+            return None
+
+        password_sent = False
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            if os.path.exists(control_path):
+                logger.info("Master session to {} established".format(hop_info))
+                return session
+
+            try:
+                index = session.expect([PASSWORD, PERMISSION_DENIED, pexpect.TIMEOUT], timeout=0.2)
+            except pexpect.EOF:
+                logger.error("Master session to {} closed: {}".format(hop_info, session.before.strip()))
+                break
+
+            if index == 0:
+                if password_sent or not hop_info.password:
+                    logger.error("Master session to {} authentication failed".format(hop_info))
+                    break
+                session.sendline(hop_info.password)
+                password_sent = True
+            elif index == 1:
+                logger.error("Master session to {} authentication failed".format(hop_info))
+                break
+        else:
+            logger.error("Master session to {} timeout".format(hop_info))
+
+        session.close(force=True)
+        return None
+
+    def _close_master(self, hop_info):
+        session = self._masters.pop(hop_info, None)
+        if session is not None:
+            logger.debug("Closing master session to {}".format(hop_info))
+            session.close(force=True)
+        control_path = self.control_path(hop_info)
+        if os.path.exists(control_path):
+            os.remove(control_path)
+
+    def close(self, hop_info=None):
+        """Close the master session to the jumphost. If `hop_info` is *None* all the master sessions are closed."""
+        hop_infos = list(self._masters) if hop_info is None else [hop_info]
+        for item in hop_infos:
+            with self._hop_lock(item):
+                self._close_master(item)
+
+        if hop_info is None and self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+
+
+jumphost_manager = JumphostManager()
+atexit.register(jumphost_manager.close)
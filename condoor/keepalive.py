@@ -0,0 +1,59 @@
+"""Provides the Keepalive class keeping the idle session alive."""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Keepalive(threading.Thread):
+    """Keepalive thread sending the newline to the idle session and waiting for the device prompt.
+
+    The keepalive is skipped if the connection is busy executing the command, so it never interleaves with the
+    command output. If the prompt is not received the session is reported as dead and the thread stops.
+    """
+
+    def __init__(self, connection, interval, timeout, callback=None):
+        """Initialize the Keepalive object.
+
+        Args:
+            connection (Connection): The connection to be kept alive.
+            interval (int): The time in seconds between the keepalives.
+            timeout (int): The time in seconds to wait for the prompt.
+            callback (func): Optional function called with the connection object as an argument when the session
+             is detected dead.
+        """
+        super(Keepalive, self).__init__(name="Keepalive-{}".format(connection.hostname))
+        self.daemon = True
+        self.connection = connection
+        self.interval = interval
+        self.timeout = timeout
+        self.callback = callback
+        self._stopped = threading.Event()
+
+    def run(self):
+        """Send the keepalive every interval until stopped or the session is dead."""
+        logger.debug("Keepalive started with {}s interval".format(self.interval))
+        while not self._stopped.wait(self.interval):
+            alive = self.connection._keepalive(self.timeout)  # pylint: disable=protected-access
+            if alive is None:
+                logger.debug("Keepalive skipped. Session busy.")
+                continue
+
+            if not alive:
+                self.connection.emit_message("Session dead. No prompt received within {}s.".format(self.timeout),
+                                             log_level=logging.ERROR)
+                if self.callback:
+                    try:
+                        self.callback(self.connection)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Keepalive callback error")
+                break
+
+        logger.debug("Keepalive stopped")
+
+    def stop(self):
+        """Stop the keepalive and wait for the thread to finish."""
+        self._stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
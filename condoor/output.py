@@ -0,0 +1,63 @@
+"""Provides the CommandOutput class returned by :meth:`condoor.Connection.send`."""
+
+
+class CommandOutput(str):
+    """The command output string carrying the command metadata.
+
+    The object is the plain string with the command echo line and the carriage returns removed, so it can be used
+    everywhere the output string was used before. Only the size of the text received from the device is kept, not
+    the text itself, so the output takes the same memory as the plain string. The lines are split once on the first
+    :meth:`lines` call.
+
+    Attributes:
+        size (int): The number of bytes received from the device after the command was sent up to the prompt.
+        command (str): The command sent.
+        elapsed (float): Time in seconds from sending the command to receiving the prompt.
+        exit_status (int): The command exit status if known, i.e. for the jumphost commands completed on the
+            end of output marker, otherwise *None*.
+    """
+
+    def __new__(cls, text, size=None, command=None, elapsed=None, exit_status=None):
+        """Create the CommandOutput object.
+
+        Args:
+            text (str): The command output.
+            size (int): The number of bytes received from the device. Defaults to the `text` length.
+            command (str): The command sent.
+            elapsed (float): Time in seconds from sending the command to receiving the prompt.
+            exit_status (int): The command exit status if known.
+        """
+        output = str.__new__(cls, text)
+        output.size = len(text) if size is None else size
+        output.command = command
+        output.elapsed = elapsed
+        output.exit_status = exit_status
+        output._lines = None  # pylint: disable=protected-access
+        return output
+
+    @classmethod
+    def from_raw(cls, raw, command=None, elapsed=None, exit_status=None):
+        """Return the CommandOutput object made of the text received after the command was sent.
+
+        The first line being the rest of the command echo and the carriage returns are removed. The carriage
+        returns are removed from the output only, without copying the whole received text first. The received text
+        is not referenced by the returned object.
+        """
+        start = raw.find('\n') + 1
+        text = raw[start:] if start else raw
+        if '\r' in text:
+            text = text.replace('\r', '')
+        return cls(text, len(raw), command, elapsed, exit_status)
+
+    def lines(self):
+        """Return the list of the output lines without the line ends.
+
+        The list is made once and shared by the subsequent calls, so it must not be modified.
+        """
+        if self._lines is None:
+            self._lines = self.splitlines()
+        return self._lines
+
+    def __reduce__(self):
+        """Return the pickle state keeping the metadata."""
+        return self.__class__, (str(self), self.size, self.command, self.elapsed, self.exit_status)
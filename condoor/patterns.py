@@ -3,6 +3,7 @@
 import os
 import re
 from utils import yaml_file_to_dict
+from condoor.searcher import set_pattern_window
 
 
 class PatternManager(object):
@@ -38,6 +39,8 @@ class PatternManager(object):
                         text_pattern = pattern['pattern']
                         compiled_pattern = re.compile(text_pattern)
                         description_pattern = pattern['description']
+                        if 'window' in pattern:
+                            set_pattern_window(text_pattern, pattern['window'])
 
                     elif isinstance(pattern, list):
                         text_pattern = self._concatenate_patterns(key, pattern)
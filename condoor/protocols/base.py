@@ -17,6 +17,14 @@ class Protocol(object):
 
         self.last_pattern = None
 
+    def spawn_session(self, ctrl):
+        """Spawn the session using the protocol specific command."""
+        ctrl.spawn_session(self.get_command())
+
+    def get_command(self):
+        """Return the protocol specific command to connect."""
+        raise NotImplementedError("Command not implemented")
+
     def connect(self, device):
         """Connect using specific protocol."""
         raise NotImplementedError("Connection method not implemented")
@@ -12,6 +12,7 @@ from condoor.actions import a_send_password, a_authentication_error, a_send, a_u
 
 from condoor.exceptions import ConnectionError, ConnectionTimeoutError
 from condoor.config import CONF
+from condoor.jumphosts import jumphost_manager, make_control_path, check_control_master
 
 logger = logging.getLogger(__name__)
 
@@ -31,27 +32,59 @@ class SSH(Protocol):
     def __init__(self, device):
         """Initialize SSH object."""
         super(SSH, self).__init__(device)
+        self.master_exists = False
 
     def get_command(self, version=2):
         """Return the SSH protocol specific command to connect."""
+        options = self._get_control_options()
         if self.username:
             # Not supported on SunOS
             # "-o ConnectTimeout={}
             command = "ssh " \
                       "-o UserKnownHostsFile=/dev/null " \
                       "-o StrictHostKeyChecking=no " \
-                      "-{} " \
-                      "-p {} {}@{}".format(version, self.port, self.username, self.hostname)
+                      "{}-{} " \
+                      "-p {} {}@{}".format(options, version, self.port, self.username, self.hostname)
         else:
             command = "ssh " \
                       "-o UserKnownHostsFile=/dev/null " \
                       "-o StrictHostKeyChecking=no " \
-                      "-{} " \
-                      "-p {} {}".format(version, self.port, self.hostname)
+                      "{}-{} " \
+                      "-p {} {}".format(options, version, self.port, self.hostname)
         return command
 
+    def _get_control_options(self):
+        """Return the ssh control master options and set `master_exists` if the live master is reused.
+
+        Only the first hop uses the control master because the control sockets are on the local host.
+        The jumphost multiplexed by :class:`condoor.jumphosts.JumphostManager` uses the process wide master session.
+        Otherwise, if `control_persist` is configured, the master is shared between the processes and stays in
+        the background after the last session disconnects. If the master dies the ssh falls back to the regular
+        connection and authentication.
+        """
+        self.master_exists = False
+        if self.device.chain.devices[0] is not self.device:
+            return ""
+
+        if _C['multiplex_jumphosts'] and not self.device.is_target:
+            control_path = jumphost_manager.acquire(self.device.node_info, timeout=_C['connect_timeout'])
+            if control_path:
+                self.master_exists = True
+                return "-o ControlMaster=no -o ControlPath={} ".format(control_path)
+
+        if _C['control_persist']:
+            control_path = make_control_path(self.device.node_info, _C['control_path_dir'])
+            self.master_exists = check_control_master(control_path, self.device.node_info)
+            return "-o ControlMaster=auto -o ControlPath={} -o ControlPersist={} ".format(
+                control_path, _C['control_persist'])
+
+        return ""
+
     def connect(self, driver):
         """Connect using the SSH protocol specific FSM."""
+        if self.master_exists:
+            return self._connect_via_master(driver)
+
         #                      0                    1                 2
         events = [driver.password_re, self.device.prompt_re, driver.unable_to_connect_re,
                   #   3          4              5               6                   7
@@ -80,8 +113,31 @@ class SSH(Protocol):
                   searchwindowsize=160)
         return fsm.run()
 
+    def _connect_via_master(self, driver):
+        """Connect using the existing control master. No key exchange and authentication is expected."""
+        #                      0                    1                 2                       3
+        events = [self.device.prompt_re, driver.password_re, driver.unable_to_connect_re, pexpect.TIMEOUT]
+
+        transitions = [
+            (self.device.prompt_re, [0], -1, partial(a_save_last_pattern, self), 0),
+            # the master has gone in the meantime and ssh fell back to the regular connection
+            (driver.password_re, [0], -1, partial(a_save_last_pattern, self), 0),
+            (driver.unable_to_connect_re, [0], -1, a_unable_to_connect, 0),
+            (pexpect.TIMEOUT, [0], 1, partial(a_send, "\r\n"), 10),
+            (pexpect.TIMEOUT, [1], -1, ConnectionTimeoutError("Connection timeout", self.hostname), 0),
+        ]
+
+        logger.debug("EXPECTED_PROMPT={}".format(pattern_to_str(self.device.prompt_re)))
+        fsm = FSM("SSH-CONNECT-MASTER", self.device, events, transitions, timeout=_C['first_prompt_timeout'],
+                  searchwindowsize=160)
+        return fsm.run()
+
     def authenticate(self, driver):
         """Authenticate using the SSH protocol specific FSM."""
+        if self.master_exists and self.last_pattern == self.device.prompt_re:
+            logger.debug("Authenticated by the control master")
+            return True
+
         #              0                     1                    2                  3
         events = [driver.press_return_re, driver.password_re, self.device.prompt_re, pexpect.TIMEOUT]
 
@@ -37,6 +37,13 @@ class Telnet(Protocol):
         """Return the Telnet protocol specific command to connect."""
         return "telnet {} {}".format(self.hostname, self.port)
 
+    def spawn_session(self, ctrl):
+        """Spawn the session using the telnet binary or the in-process telnet client depending on configuration."""
+        if _C['transport'] == 'socket':
+            ctrl.spawn_telnet_session(self.hostname, self.port)
+        else:
+            super(Telnet, self).spawn_session(ctrl)
+
     def connect(self, driver):
         """Connect using the Telnet protocol specific FSM."""
         #              0            1                              2                      3
@@ -0,0 +1,454 @@
+"""Provides the classes recording the session transcript and replaying it offline through the Controller interface.
+
+The transcript is the list of steps. Each step is the dict with either the `read` key holding the text received from
+the device and the optional `delay` key with the time in seconds since the previous step, or the `send` key holding
+the text expected to be sent to the device. The transcript is stored as the YAML file, i.e.::
+
+    - send: "admin reload location all"
+    - read: "admin reload location all"
+    - send: "\\n"
+    - read: "\\r\\nProceed with reload? [confirm]"
+      delay: 0.5
+    - send: "\\r"
+
+The transcript is recorded with :class:`TranscriptRecorder` passed as the connection logfile and replayed with
+:class:`ReplayController` which feeds the received data into the real driver and protocol FSMs and verifies the data
+they send back.
+
+:class:`ScriptedController` runs the FSMs against the scripted command outputs kept in memory, i.e. to measure the
+FSM and the command execution overhead without the process, pty and network noise.
+"""
+
+import time
+import logging
+from collections import deque
+
+import yaml
+from pexpect import EOF, TIMEOUT
+from pexpect.spawnbase import SpawnBase
+
+from condoor.controller import Controller
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMismatch(AssertionError):
+    """Raised when the data sent during the replay is different than recorded in the transcript."""
+
+
+def load_transcript(filename):
+    """Load the transcript from the YAML file and return the list of steps."""
+    with open(filename, 'r') as f:
+        steps = yaml.safe_load(f)
+    return steps or []
+
+
+def save_transcript(steps, filename):
+    """Save the list of steps to the YAML file."""
+    with open(filename, 'w') as f:
+        yaml.safe_dump(list(steps), f, default_flow_style=False)
+
+
+class _SendLog(object):
+    """File-like object passing the sent data to the recorder."""
+
+    def __init__(self, recorder):
+        self._recorder = recorder
+
+    def write(self, data):
+        self._recorder.record('send', data)
+
+    def flush(self):
+        pass
+
+
+class TranscriptRecorder(object):
+    """TranscriptRecorder class recording the session transcript.
+
+    The recorder is the file-like object passed as the connection logfile, i.e.::
+
+        recorder = TranscriptRecorder()
+        conn.connect(logfile=recorder)
+        conn.reload()
+        recorder.save("reload.yaml")
+
+    The data received is recorded from the logfile writes and the data sent from the `send_log` attribute which the
+    controller sets as the session `logfile_send`. The consecutive data in the same direction is merged into the
+    single step. Optionally the writes are passed to the other logfile.
+    """
+
+    def __init__(self, logfile=None):
+        """Initialize the TranscriptRecorder object.
+
+        Args:
+            logfile (file): Optional file-like object the received data is also written to.
+        """
+        self.steps = []
+        self.logfile = logfile
+        self.send_log = _SendLog(self)
+        self._last = time.time()
+
+    def record(self, direction, data):
+        """Record the data in the direction `read` or `send`."""
+        now = time.time()
+        last_step = self.steps[-1] if self.steps else None
+        if last_step is not None and direction in last_step:
+            last_step[direction] += data
+        else:
+            step = {direction: data}
+            if direction == 'read':
+                step['delay'] = round(now - self._last, 3)
+            self.steps.append(step)
+        self._last = now
+
+    def write(self, data):
+        """Record the received data."""
+        self.record('read', data)
+        if self.logfile:
+            self.logfile.write(data)
+
+    def flush(self):
+        """Flush the other logfile."""
+        if self.logfile:
+            self.logfile.flush()
+
+    def save(self, filename):
+        """Save the recorded transcript to the YAML file."""
+        save_transcript(self.steps, filename)
+
+
+class InMemorySpawn(SpawnBase):
+    """InMemorySpawn class providing the pexpect session interface without the process or the network connection.
+
+    The subclasses implement `read_nonblocking` and `send`.
+    """
+
+    def __init__(self, maxread=50000):
+        """Initialize the InMemorySpawn object."""
+        super(InMemorySpawn, self).__init__(timeout=30, maxread=maxread, searchwindowsize=None)
+        self.delaybeforesend = None
+        self.delayafterread = None
+        # the list of all the data sent
+        self.sent = []
+        self.closed = False
+        self._winsize = (24, 80)
+
+    def sendline(self, s=''):
+        """Send the data followed by the line separator."""
+        return self.send(s + self.linesep)
+
+    def sendcontrol(self, char):
+        """Send the control character."""
+        char = char.lower()
+        code = ord(char) - 96 if 'a' <= char <= 'z' else {'@': 0, '[': 27, '\\': 28, ']': 29, '^': 30, '_': 31,
+                                                           '?': 127}.get(char, 0)
+        return self.send(chr(code))
+
+    def setecho(self, state):
+        """Do nothing. The echo is the part of the session data."""
+
+    def getwinsize(self):
+        """Return the terminal window size."""
+        return self._winsize
+
+    def setwinsize(self, rows, cols):
+        """Set the terminal window size."""
+        self._winsize = (rows, cols)
+
+    def isalive(self):
+        """Return True until the session is closed or EOF received."""
+        return not (self.closed or self.flag_eof)
+
+    def close(self, force=True):
+        """Close the session."""
+        self.closed = True
+
+    def wait(self):
+        """Return the exit status."""
+        return 0
+
+
+class ReplaySpawn(InMemorySpawn):
+    """ReplaySpawn class providing the pexpect session interface for the transcript replay.
+
+    The data of the read steps is returned in order. The step delay is slept only in the realtime mode, otherwise
+    it is accounted against the read timeout, so the timeouts happen the same as during the recording but without
+    waiting. The read blocks, i.e. times out, until the data of the next send step is sent. The sent data is compared
+    with the send steps and :class:`ReplayMismatch` is raised on difference. The data sent after the last send step
+    is not verified. The session is closed with EOF after the last step.
+    """
+
+    def __init__(self, steps, realtime=False, maxread=50000):
+        """Initialize the ReplaySpawn object.
+
+        Args:
+            steps (list): The list of the transcript steps.
+            realtime (bool): If True the recorded delays are slept.
+            maxread (int): The maximum number of bytes read at once.
+        """
+        super(ReplaySpawn, self).__init__(maxread=maxread)
+        self.steps = [dict(step) for step in steps]
+        self.realtime = realtime
+        self._index = 0
+        self._matched = 0
+        self._last_send = max([index for index, step in enumerate(self.steps) if 'send' in step] or [-1])
+
+    @property
+    def finished(self):
+        """Return True if all the transcript steps were replayed."""
+        return self._index >= len(self.steps)
+
+    @property
+    def remaining(self):
+        """Return the list of the steps not replayed yet."""
+        return self.steps[self._index:]
+
+    def _wait(self, delay):
+        if self.realtime and delay is not None and delay > 0:
+            time.sleep(delay)
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        """Return the data of the next read step."""
+        if timeout == -1:
+            timeout = self.timeout
+
+        if self.finished:
+            self.flag_eof = True
+            raise EOF("End of transcript")
+
+        step = self.steps[self._index]
+        if 'read' not in step:
+            # the code is waiting for the data before sending what is expected
+            self._wait(timeout)
+            raise TIMEOUT("Waiting for the data to be sent: {!r}".format(step['send'][self._matched:]))
+
+        delay = step.get('delay', 0)
+        if timeout is not None and delay > timeout:
+            self._wait(timeout)
+            step['delay'] = delay - timeout
+            raise TIMEOUT("Timeout exceeded.")
+
+        self._wait(delay)
+        step['delay'] = 0
+        data = step['read'][:size]
+        step['read'] = step['read'][size:]
+        if not step['read']:
+            self._index += 1
+        self._log(data, 'read')
+        return data
+
+    def send(self, s):
+        """Send the data and verify it against the transcript."""
+        self._log(s, 'send')
+        self.sent.append(s)
+        data = s
+        while data and self._index <= self._last_send:
+            step = self.steps[self._index]
+            if 'send' not in step:
+                raise ReplayMismatch("Unexpected data sent: {!r}. Expected to read: {!r}".format(
+                    data, step['read']))
+
+            expected = step['send'][self._matched:]
+            length = min(len(data), len(expected))
+            if data[:length] != expected[:length]:
+                raise ReplayMismatch("Unexpected data sent: {!r}. Expected: {!r}".format(data, expected))
+
+            self._matched += length
+            data = data[length:]
+            if self._matched == len(step['send']):
+                self._index += 1
+                self._matched = 0
+
+        return len(s)
+
+
+class ScriptedSpawn(InMemorySpawn):
+    """ScriptedSpawn class providing the pexpect session interface answering the commands with the scripted outputs.
+
+    The data sent is echoed back and every complete line is answered with the scripted output of the command followed
+    by the prompt. The unknown commands are answered with the prompt only. The command with *None* output is not
+    answered, i.e. to emulate the long running command, until the Ctrl-C is sent. The data is returned in chunks no
+    longer than `chunk_size`. The read times out immediately if there is no data queued.
+    """
+
+    def __init__(self, outputs=None, prompt="", chunk_size=4096, maxread=50000):
+        """Initialize the ScriptedSpawn object.
+
+        Args:
+            outputs (dict): The dict mapping the command to its output. The output is the string or the list of
+             the output chunks.
+            prompt (str): The device prompt sent after the command output.
+            chunk_size (int): The maximum size of the data chunk returned at once.
+            maxread (int): The maximum number of bytes read at once.
+        """
+        super(ScriptedSpawn, self).__init__(maxread=maxread)
+        self.outputs = outputs or {}
+        self.prompt = prompt
+        self.chunk_size = chunk_size
+        self._chunks = deque()
+        self._line = ""
+
+    def feed(self, data):
+        """Queue the data or the list of data chunks to be read."""
+        if isinstance(data, list):
+            self._chunks.extend(chunk for chunk in data if chunk)
+            return
+
+        for start in range(0, len(data), self.chunk_size):
+            self._chunks.append(data[start:start + self.chunk_size])
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        """Return the next queued data chunk."""
+        if self.closed:
+            self.flag_eof = True
+            raise EOF("Session closed")
+
+        if not self._chunks:
+            raise TIMEOUT("No data queued.")
+
+        data = self._chunks.popleft()
+        if len(data) > size:
+            self._chunks.appendleft(data[size:])
+            data = data[:size]
+        self._log(data, 'read')
+        return data
+
+    def send(self, s):
+        """Echo the data and queue the command output for each complete line."""
+        self._log(s, 'send')
+        self.sent.append(s)
+        if "\x03" in s:
+            self._line = ""
+            self.feed("^C\r\n" + self.prompt)
+            return len(s)
+
+        lines = (self._line + s.replace("\r\n", "\n").replace("\r", "\n")).split("\n")
+        self._line = lines.pop()
+        self.feed(s.replace("\r", "").replace("\n", ""))
+        for line in lines:
+            self.feed("\r\n")
+            output = self.outputs.get(line.strip(), "")
+            if output is None:
+                continue
+            self.feed(output)
+            self.feed("\r\n" + self.prompt if output else self.prompt)
+        return len(s)
+
+
+class InMemoryController(Controller):
+    """InMemoryController class spawning the in-memory session instead of the process or the network connection.
+
+    The subclasses provide the session object implementing the pexpect session interface with :meth:`make_session`.
+    """
+
+    def make_session(self):
+        """Return the new in-memory session object."""
+        raise NotImplementedError
+
+    def _spawn_in_memory(self):
+        self._session = self.make_session()
+        self._session.logfile_read = self._logfile_fd
+        self._session.logfile_send = getattr(self._logfile_fd, 'send_log', None)
+        self.connected = True
+
+    def spawn_session(self, command):
+        """Spawn the in-memory session or send the command if already spawned."""
+        if self._session and self.isalive():  # pylint: disable=no-member
+            super(InMemoryController, self).spawn_session(command)
+            return
+
+        logger.debug("Spawning in-memory session for command: '{}'".format(command))
+        self._spawn_in_memory()
+
+    def spawn_telnet_session(self, hostname, port):
+        """Spawn the in-memory session or send the telnet command if already spawned."""
+        if self._session and self.isalive():  # pylint: disable=no-member
+            super(InMemoryController, self).spawn_telnet_session(hostname, port)
+            return
+
+        logger.debug("Spawning in-memory telnet session to: {}:{}".format(hostname, port))
+        self._spawn_in_memory()
+
+    def start(self):
+        """Spawn the in-memory session directly, i.e. for running the driver FSMs on the connected device."""
+        self._spawn_in_memory()
+        return self
+
+    @property
+    def sent(self):
+        """Return the list of the data sent to the session."""
+        return self._session.sent if self._session else []
+
+
+class ReplayController(InMemoryController):
+    """ReplayController class replaying the transcript through the Controller interface.
+
+    The session spawned by the controller is :class:`ReplaySpawn`, so the real protocol and driver FSMs are run
+    against the recorded data without the device or the network connection, i.e.::
+
+        ctrl = ReplayController(connection, load_transcript("reload.yaml"))
+        device.ctrl = ctrl
+        device.reload(reload_timeout=300, save_config=False, no_reload_cmd=False)
+        ctrl.assert_finished()
+
+    In the default mode the replay is run as fast as possible with the recorded delays accounted against the
+    timeouts. In the realtime mode the recorded delays are slept.
+    """
+
+    def __init__(self, connection, transcript, realtime=False):
+        """Initialize the ReplayController object.
+
+        Args:
+            connection (Connection): The connection object.
+            transcript (list or str): The list of steps or the YAML transcript filename.
+            realtime (bool): If True the transcript is replayed at the recorded speed.
+        """
+        super(ReplayController, self).__init__(connection)
+        if not isinstance(transcript, list):
+            transcript = load_transcript(transcript)
+        self._steps = transcript
+        self._realtime = realtime
+
+    def make_session(self):
+        """Return the session replaying the transcript."""
+        return ReplaySpawn(self._steps, realtime=self._realtime)
+
+    def assert_finished(self):
+        """Raise :class:`ReplayMismatch` if not all the transcript steps were replayed."""
+        if self._session is None or not self._session.finished:
+            remaining = self._session.remaining if self._session else self._steps
+            raise ReplayMismatch("Transcript not finished. Remaining steps: {!r}".format(remaining[:3]))
+
+
+class ScriptedController(InMemoryController):
+    """ScriptedController class running the FSMs against the scripted command outputs kept in memory, i.e.::
+
+        ctrl = ScriptedController(connection, {"show clock": "06:33:02.218 UTC Thu Jan 19 2017"},
+                                  prompt="RP/0/RSP0/CPU0:ios#").start()
+        device.ctrl = ctrl
+        device.send("show clock")
+
+    Refer to :class:`ScriptedSpawn`.
+    """
+
+    def __init__(self, connection, outputs=None, prompt="", chunk_size=4096):
+        """Initialize the ScriptedController object.
+
+        Args:
+            connection (Connection): The connection object.
+            outputs (dict): The dict mapping the command to its output.
+            prompt (str): The device prompt sent after the command output.
+            chunk_size (int): The maximum size of the data chunk returned at once.
+        """
+        super(ScriptedController, self).__init__(connection)
+        self._outputs = outputs
+        self._prompt = prompt
+        self._chunk_size = chunk_size
+
+    def make_session(self):
+        """Return the session answering the commands with the scripted outputs."""
+        return ScriptedSpawn(self._outputs, prompt=self._prompt, chunk_size=self._chunk_size)
+
+    def feed(self, data):
+        """Queue the data or the list of data chunks to be read."""
+        self._session.feed(data)
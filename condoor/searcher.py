@@ -0,0 +1,246 @@
+"""Provides the IncrementalSearcher class searching only the newly received data for the expected patterns."""
+
+import re
+import sre_parse
+import logging
+
+from pexpect import EOF, TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# pattern text -> window size declared in patterns.yaml
+_WINDOWS = {}
+# pattern text -> window size derived from the pattern
+_WIDTHS = {}
+# (pattern text, flags) -> True if the pattern is anchored at the start
+_ANCHORED = {}
+# pattern list key -> combined pattern or None
+_COMBINED = {}
+_COMBINED_MAX = 100
+
+# named group definition not preceded by the escape character
+_NAMED_GROUP_RE = re.compile(r"(?<!\\)((?:\\\\)*)\(\?P<\w+>")
+# backreferences, conditional groups and inline flags changing the meaning of the combined pattern
+_NOT_COMBINABLE_RE = re.compile(r"\(\?P=|\\[1-9]|\(\?\(|\(\?[iLmsux]+\)")
+
+
+def set_pattern_window(pattern, window):
+    """Declare the maximum length of the text matched by the pattern.
+
+    The declared window overrides the one derived from the pattern. It is required for the patterns with the
+    unbounded match length, i.e. containing `*` or `+`, if the matched text can be longer than the default overlap.
+
+    Args:
+        pattern (str): The pattern text.
+        window (int): The maximum length of the text matched by the pattern.
+    """
+    _WINDOWS[pattern] = int(window)
+
+
+def pattern_window(pattern, default):
+    """Return the maximum length of the text matched by the compiled pattern.
+
+    The window is declared with :func:`set_pattern_window` or derived from the pattern. The `default` is returned
+    if the pattern match length is unbounded.
+    """
+    text = pattern.pattern
+    window = _WINDOWS.get(text)
+    if window is not None:
+        return window
+
+    width = _WIDTHS.get((text, pattern.flags))
+    if width is None:
+        try:
+            width = sre_parse.parse(text, pattern.flags).getwidth()[1]
+        except Exception:  # pylint: disable=broad-except
+            width = sre_parse.MAXREPEAT
+        if width >= sre_parse.MAXREPEAT:
+            width = None
+        _WIDTHS[(text, pattern.flags)] = width
+
+    return default if width is None else width
+
+
+def _is_anchored(pattern):
+    """Return True if the compiled pattern contains the `^` or `\\A` anchor."""
+    def walk(item):
+        if isinstance(item, sre_parse.SubPattern):
+            for op, av in item:
+                if op == sre_parse.AT and av in (sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING):
+                    return True
+                if walk(av):
+                    return True
+        elif isinstance(item, (list, tuple)):
+            return any(walk(value) for value in item)
+        return False
+
+    key = (pattern.pattern, pattern.flags)
+    anchored = _ANCHORED.get(key)
+    if anchored is None:
+        try:
+            anchored = walk(sre_parse.parse(pattern.pattern, pattern.flags))
+        except Exception:  # pylint: disable=broad-except
+            anchored = True
+        _ANCHORED[key] = anchored
+    return anchored
+
+
+def combine_patterns(patterns):
+    """Return the single regular expression matching any of the compiled patterns.
+
+    The patterns are joined into the alternation which matches at the earliest position and the first listed
+    alternative wins if more of them match at the same position, the same as searching for each pattern separately.
+    The alternatives are not wrapped into the groups, so the regular expression engine keeps the first character
+    optimization if all the patterns start with the literal. The pattern named groups are changed to the numbered
+    ones to avoid the name conflicts.
+
+    Returns:
+        The combined compiled pattern or *None* if there are no patterns or they can not be combined, i.e. use
+        different flags or contain backreferences.
+    """
+    key = tuple((pattern.pattern, pattern.flags) for pattern in patterns)
+    if key in _COMBINED:
+        return _COMBINED[key]
+
+    combined = None
+    flags = set(pattern.flags for pattern in patterns)
+    if patterns and len(flags) == 1 and not any(_NOT_COMBINABLE_RE.search(pattern.pattern) for pattern in patterns):
+        try:
+            combined = re.compile("|".join(_NAMED_GROUP_RE.sub(r"\1(", pattern.pattern) for pattern in patterns),
+                                  flags.pop())
+        except (re.error, AssertionError, OverflowError):
+            # i.e. more than 100 groups in python 2
+            logger.debug("Unable to combine the patterns. Searching separately.")
+
+    if len(_COMBINED) >= _COMBINED_MAX:
+        _COMBINED.clear()
+    _COMBINED[key] = combined
+    return combined
+
+
+class IncrementalSearcher(object):
+    """IncrementalSearcher class searching the newly received data plus the bounded overlap for each pattern.
+
+    The class provides the same interface as :class:`pexpect.searcher_re` so it is used with the pexpect
+    `expect_loop`. The pexpect regular expression searcher rescans the whole buffer received since the last match
+    for all the patterns every time the new data arrives, which makes the large command output processing time
+    quadratic to its size. This searcher starts searching each pattern at the start of the fresh data minus the
+    maximum length of the text matched by the pattern, so every byte is scanned by each pattern the bounded number
+    of times. The `longest_string` attribute makes pexpect keep only the maximum overlap of the already searched
+    data in its search buffer.
+
+    The match is the same as with the full search as long as the matched text is not longer than the pattern window.
+    Refer to :func:`pattern_window`. The patterns anchored with `^` or `\\A` are searched from the start of the data
+    received since the last match while it is in the search buffer. Later the buffer starts in the middle of the
+    data, so the anchors are not matched at the buffer start, the same as with the full search.
+
+    Optionally all the patterns are searched in a single pass with the combined regular expression. Refer to
+    :func:`combine_patterns`. The combined search starts at the largest pattern window, so it is not faster than
+    the separate searches if the windows differ much or the patterns start with the literal text. Use
+    benchmarks/bench_matcher.py to compare both for the specific event lists. The pexpect EOF and TIMEOUT are not the
+    part of the search and are handled by pexpect using the `eof_index` and `timeout_index` attributes.
+    """
+
+    def __init__(self, patterns, default_window=4096, combine=False):
+        """Initialize the IncrementalSearcher object.
+
+        Args:
+            patterns (list): The list of the compiled regular expressions or pexpect EOF and TIMEOUT.
+            default_window (int): The window used for the patterns with unbounded match length.
+            combine (bool): If True the patterns are searched with the single combined regular expression when
+             possible.
+        """
+        self.eof_index = -1
+        self.timeout_index = -1
+        self.start = None
+        self.end = None
+        self.match = None
+        self._searches = []
+        for index, pattern in enumerate(patterns):
+            if pattern is EOF:
+                self.eof_index = index
+            elif pattern is TIMEOUT:
+                self.timeout_index = index
+            else:
+                self._searches.append((index, pattern, pattern_window(pattern, default_window)))
+
+        self.longest_string = max([window for _, _, window in self._searches] or [0])
+        self._combined = combine_patterns([pattern for _, pattern, _ in self._searches]) if combine else None
+        self._anchored = set(index for index, pattern, _ in self._searches if _is_anchored(pattern))
+        # the number of characters received since the searcher was created
+        self._seen = 0
+
+    def __str__(self):
+        """Return the string representing the searcher."""
+        lines = [(index, "    {}: re.compile({!r}) window={}".format(index, pattern.pattern, window))
+                 for index, pattern, window in self._searches]
+        lines.append((-1, "IncrementalSearcher:"))
+        if self.eof_index >= 0:
+            lines.append((self.eof_index, "    {}: EOF".format(self.eof_index)))
+        if self.timeout_index >= 0:
+            lines.append((self.timeout_index, "    {}: TIMEOUT".format(self.timeout_index)))
+        return "\n".join(line for _, line in sorted(lines))
+
+    def search(self, buffer, freshlen, searchwindowsize=None):
+        """Search the buffer for the earliest match of the patterns.
+
+        Args:
+            buffer (str): The text to be searched.
+            freshlen (int): The number of characters at the end of the buffer which have not been searched before.
+            searchwindowsize (int): If set, only the last `searchwindowsize` characters are searched.
+
+        Returns:
+            int: The index of the matched pattern or -1. On match the `start`, `end` and `match` attributes are set.
+        """
+        fresh_start = len(buffer) - freshlen
+        window_start = 0 if searchwindowsize is None else max(0, len(buffer) - searchwindowsize)
+        self._seen += freshlen
+        # the buffer starts with the first character received unless trimmed by pexpect to the lookback
+        at_start = searchwindowsize is None and len(buffer) >= self._seen
+
+        if self._combined is not None:
+            match = self._combined.search(buffer, self._position(bool(self._anchored), at_start, max(
+                window_start, fresh_start - self.longest_string)))
+            if match is None:
+                return -1
+            # the first listed pattern matching at the position is the matched alternative. The match object of
+            # the original pattern keeps its groups.
+            position = match.start()
+            for index, pattern, _ in self._searches:
+                match = pattern.match(buffer, position)
+                if match is not None:
+                    return self._set_match(match, index)
+
+        first_match = None
+        for index, pattern, window in self._searches:
+            position = max(window_start, fresh_start - window)
+            if self._anchored:
+                position = self._position(index in self._anchored, at_start, position)
+            match = pattern.search(buffer, position)
+            if match is None:
+                continue
+            if first_match is None or match.start() < first_match.start():
+                first_match = match
+                best_index = index
+
+        if first_match is None:
+            return -1
+
+        return self._set_match(first_match, best_index)
+
+    @staticmethod
+    def _position(anchored, at_start, position):
+        """Return the search start position for the anchored pattern.
+
+        The anchored pattern is searched from the buffer start if it is the start of the data, so `^` can match
+        there. Otherwise the search starts at least at the second character, so `^` does not match at the cut.
+        """
+        if not anchored:
+            return position
+        return 0 if at_start else max(1, position)
+
+    def _set_match(self, match, index):
+        self.match = match
+        self.start = match.start()
+        self.end = match.end()
+        return index
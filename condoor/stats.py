@@ -0,0 +1,168 @@
+"""Provides the FSMStats class collecting the FSM transition and timing statistics."""
+
+import threading
+from bisect import bisect_left
+
+# The upper bounds in seconds of the timing histogram buckets. The last bucket is unbounded.
+BUCKETS = (0.01, 0.1, 1, 10, 60)
+
+
+class Timing(object):
+    """Timing class keeping the number of samples, total and maximum time and the histogram.
+
+    The histogram is the list of the sample counts in buckets bounded by :data:`BUCKETS` with the last bucket for
+    the samples greater than the last bound.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'histogram')
+
+    def __init__(self):
+        """Initialize the Timing object."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, value):
+        """Add the time sample in seconds."""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.histogram[bisect_left(BUCKETS, value)] += 1
+
+    def merge(self, other):
+        """Add the samples from the other Timing object."""
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def as_dict(self):
+        """Return the dict representation of the timing."""
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'histogram': list(self.histogram)}
+
+
+class _FSMRecord(object):
+    """The statistics of the single FSM."""
+
+    def __init__(self):
+        self.runs = 0
+        self.transitions = 0
+        self.timeouts = 0
+        self.exhausted = 0
+        # state -> Timing of waiting for the event in the state
+        self.states = {}
+        # event -> Timing of waiting for the event
+        self.events = {}
+        # Timing of the actions execution
+        self.actions = Timing()
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.transitions += other.transitions
+        self.timeouts += other.timeouts
+        self.exhausted += other.exhausted
+        for mine, theirs in ((self.states, other.states), (self.events, other.events)):
+            for key, timing in theirs.items():
+                mine.setdefault(key, Timing()).merge(timing)
+        self.actions.merge(other.actions)
+
+    def as_dict(self):
+        return {
+            'runs': self.runs,
+            'transitions': self.transitions,
+            'timeouts': self.timeouts,
+            'exhausted': self.exhausted,
+            'states': {state: timing.as_dict() for state, timing in self.states.items()},
+            'events': {event: timing.as_dict() for event, timing in self.events.items()},
+            'actions': self.actions.as_dict(),
+        }
+
+
+class FSMStats(object):
+    """FSMStats class collecting the statistics of the FSMs run on the connection.
+
+    The statistics are kept per FSM name: the number of runs and transitions, the time spent waiting in each state
+    and for each event, the time spent in the actions, the number of timeouts hit and the number of runs stopped
+    after reaching the maximum number of transitions. The statistics of many connections can be merged, i.e.::
+
+        stats = FSMStats.merged(conn.fsm_stats for conn in connections)
+        print(stats.as_dict()['SSH-AUTH']['states'])
+
+    """
+
+    def __init__(self):
+        """Initialize the FSMStats object."""
+        self._lock = threading.Lock()
+        self._fsms = {}
+
+    def _record(self, name):
+        record = self._fsms.get(name)
+        if record is None:
+            record = self._fsms[name] = _FSMRecord()
+        return record
+
+    def record_run(self, name):
+        """Record the FSM start."""
+        with self._lock:
+            self._record(name).runs += 1
+
+    def record_transition(self, name, state, event, wait_time, timeout):
+        """Record the FSM transition.
+
+        Args:
+            name (str): The FSM name.
+            state (int): The state the event was received in.
+            event (str): The event description.
+            wait_time (float): The time in seconds spent waiting for the event.
+            timeout (bool): True if the event is the timeout.
+        """
+        with self._lock:
+            record = self._record(name)
+            record.transitions += 1
+            if timeout:
+                record.timeouts += 1
+            record.states.setdefault(state, Timing()).add(wait_time)
+            record.events.setdefault(event, Timing()).add(wait_time)
+
+    def record_action(self, name, action_time):
+        """Record the time in seconds spent in the FSM action."""
+        with self._lock:
+            self._record(name).actions.add(action_time)
+
+    def record_exhausted(self, name):
+        """Record the FSM stopped after reaching the maximum number of transitions."""
+        with self._lock:
+            self._record(name).exhausted += 1
+
+    def merge(self, other):
+        """Add the statistics from the other FSMStats object."""
+        with other._lock:  # pylint: disable=protected-access
+            records = list(other._fsms.items())  # pylint: disable=protected-access
+        with self._lock:
+            for name, record in records:
+                self._record(name).merge(record)
+
+    @classmethod
+    def merged(cls, stats):
+        """Return the new FSMStats object with the statistics from the iterable of FSMStats objects."""
+        result = cls()
+        for item in stats:
+            result.merge(item)
+        return result
+
+    def clear(self):
+        """Remove all the statistics."""
+        with self._lock:
+            self._fsms.clear()
+
+    def as_dict(self):
+        """Return the dict mapping the FSM name to its statistics.
+
+        The FSM statistics is the dict with the following keys: `runs`, `transitions`, `timeouts`, `exhausted`,
+        `states` mapping the state to its timing, `events` mapping the event to its timing and `actions` timing.
+        The timing is the dict with the `count`, `total`, `max` and `histogram` keys. Refer to :class:`Timing`.
+        """
+        with self._lock:
+            return {name: record.as_dict() for name, record in self._fsms.items()}
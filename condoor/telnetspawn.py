@@ -0,0 +1,333 @@
+"""Provides the TelnetSpawn class implementing the telnet client over the socket with pexpect interface."""
+
+import re
+import errno
+import time
+import select
+import socket
+import logging
+import struct
+
+import pexpect
+from pexpect.spawnbase import SpawnBase
+
+logger = logging.getLogger(__name__)
+
+# Telnet commands (RFC 854)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+# Telnet options
+ECHO = 1
+SGA = 3  # Suppress Go Ahead (RFC 858)
+TTYPE = 24  # Terminal Type (RFC 1091)
+NAWS = 31  # Negotiate About Window Size (RFC 1073)
+
+TTYPE_IS = 0
+TTYPE_SEND = 1
+
+# Options the client is willing to enable on its side
+LOCAL_OPTIONS = (SGA, TTYPE, NAWS)
+# Options the client accepts to be enabled on the server side
+REMOTE_OPTIONS = (ECHO, SGA)
+
+_CONTROL_CHARS = {'@': 0, '`': 0, '[': 27, '{': 27, '\\': 28, '|': 28, ']': 29, '}': 29, '^': 30, '~': 30,
+                  '_': 31, '?': 127}
+
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+
+
+def _newline(match):
+    # NVT end of line is CR LF and the bare CR must be followed by NUL (RFC 854)
+    return "\r\n" if match.group() != "\r" else "\r\0"
+
+
+class TelnetSpawn(SpawnBase):
+    """TelnetSpawn class implementing the telnet client in process.
+
+    The class provides the same interface as :class:`pexpect.spawn` used by :class:`condoor.controller.Controller`,
+    so the session does not require the telnet binary, pty nor the child process. The telnet options are negotiated
+    according to RFC 854. The client supports the terminal type and the window size (NAWS) options and accepts the
+    server side echo and suppress go ahead. All other options are refused.
+
+    The output produced by the telnet binary when connecting is emulated, so the protocol FSMs work the same way
+    for both transports.
+    """
+
+    close_timeout = 1
+    write_timeout = 30
+
+    def __init__(self, hostname, port=23, timeout=30, connect_timeout=30, maxread=2000, searchwindowsize=None,
+                 logfile=None, terminal_type="VT100", dimensions=(1024, 160)):
+        """Initialize the TelnetSpawn object and connect to the host.
+
+        Args:
+            hostname (str): The host to connect.
+            port (int): The TCP port.
+            timeout (int): The default expect timeout.
+            connect_timeout (int): The TCP connection timeout.
+            maxread (int): The maximum number of bytes read at once.
+            searchwindowsize (int): The default search window size.
+            logfile (file): The session log file.
+            terminal_type (str): The terminal type reported to the server.
+            dimensions (tuple): The (rows, cols) terminal window size reported to the server.
+        """
+        super(TelnetSpawn, self).__init__(timeout=timeout, maxread=maxread, searchwindowsize=searchwindowsize,
+                                          logfile=logfile)
+        self.hostname = hostname
+        self.port = int(port)
+        self.terminal_type = terminal_type
+        self.rows, self.cols = dimensions
+        self.args = [hostname, str(port)]
+        self.command = "telnet"
+        self.name = "<telnet {}:{}>".format(hostname, port)
+
+        self._socket = None
+        self._received = bytearray()
+        self._enabled = set()
+        self._pending = "Trying {}...\r\n".format(hostname)
+        self.closed = True
+        try:
+            self._socket = socket.create_connection((hostname, self.port), connect_timeout)
+        except socket.timeout:
+            self._pending += "telnet: connect to address {}: Connection timed out\r\n".format(hostname)
+            self.flag_eof = True
+        except (socket.error, socket.gaierror) as e:  # pylint: disable=invalid-name
+            message = e.args[-1] if e.args else str(e)
+            self._pending += "telnet: Unable to connect to remote host: {}\r\n".format(message)
+            self.flag_eof = True
+        else:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._socket.setblocking(False)
+            self.child_fd = self._socket.fileno()
+            self.closed = False
+            self._pending += "Connected to {}.\r\nEscape character is '^]'.\r\n".format(hostname)
+            logger.debug("Connected to {}:{}".format(hostname, port))
+
+    def _negotiate(self, command, option):
+        """Reply to the option negotiation request."""
+        if command == DO:
+            if option in LOCAL_OPTIONS:
+                if option not in self._enabled:
+                    self._enabled.add(option)
+                    self._send_raw(bytearray([IAC, WILL, option]))
+                if option == NAWS:
+                    self._send_naws()
+            else:
+                self._send_raw(bytearray([IAC, WONT, option]))
+        elif command == DONT:
+            if option in self._enabled:
+                self._enabled.discard(option)
+                self._send_raw(bytearray([IAC, WONT, option]))
+        elif command == WILL:
+            self._send_raw(bytearray([IAC, DO if option in REMOTE_OPTIONS else DONT, option]))
+        elif command == WONT:
+            self._send_raw(bytearray([IAC, DONT, option]))
+
+    def _subnegotiate(self, data):
+        """Reply to the option subnegotiation."""
+        if len(data) >= 2 and data[0] == TTYPE and data[1] == TTYPE_SEND:
+            self._send_raw(bytearray([IAC, SB, TTYPE, TTYPE_IS]) + bytearray(self.terminal_type) +
+                           bytearray([IAC, SE]))
+
+    def _send_naws(self):
+        size = bytearray(struct.pack("!HH", self.cols, self.rows)).replace(bytearray([IAC]), bytearray([IAC, IAC]))
+        self._send_raw(bytearray([IAC, SB, NAWS]) + size + bytearray([IAC, SE]))
+
+    def _process(self):
+        """Return the data received without the telnet commands and handle the commands.
+
+        The incomplete command is left in the buffer until more data is received.
+        """
+        data = self._received
+        output = bytearray()
+        index = 0
+        length = len(data)
+        while index < length:
+            byte = data[index]
+            if byte != IAC:
+                next_iac = data.find(bytearray([IAC]), index)
+                end = length if next_iac == -1 else next_iac
+                output += data[index:end]
+                index = end
+                continue
+
+            if index + 1 >= length:
+                break
+            command = data[index + 1]
+            if command == IAC:
+                output.append(IAC)
+                index += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if index + 2 >= length:
+                    break
+                self._negotiate(command, data[index + 2])
+                index += 3
+            elif command == SB:
+                end = data.find(bytearray([IAC, SE]), index + 2)
+                if end == -1:
+                    break
+                self._subnegotiate(data[index + 2:end])
+                index = end + 2
+            else:
+                # NOP, GA, DM and other commands without the option
+                index += 2
+
+        self._received = data[index:]
+        return str(output)
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        """Read at most `size` bytes from the socket.
+
+        Args:
+            size (int): The maximum number of bytes to be returned.
+            timeout (int): The time in seconds to wait for the data. When -1, use self.timeout. When None, wait
+             indefinitely.
+
+        Raises:
+            pexpect.TIMEOUT: If no data is received within the `timeout`.
+            pexpect.EOF: If the connection is closed.
+        """
+        if self._pending:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            self._log(data, 'read')
+            return data
+
+        if self.closed:
+            self.flag_eof = True
+            raise pexpect.EOF("End Of File (EOF). Connection closed.")
+
+        if timeout == -1:
+            timeout = self.timeout
+
+        try:
+            readable, _, _ = select.select([self._socket], [], [], timeout)
+        except select.error as e:  # pylint: disable=invalid-name
+            if e.args[0] == errno.EINTR:
+                return ''
+            raise
+
+        if not readable:
+            raise pexpect.TIMEOUT("Timeout exceeded.")
+
+        try:
+            received = self._socket.recv(size)
+        except socket.error as e:  # pylint: disable=invalid-name
+            if e.args[0] in (errno.EAGAIN, errno.EINTR):
+                return ''
+            received = ''
+
+        if not received:
+            self.close()
+            self.flag_eof = True
+            raise pexpect.EOF("End Of File (EOF). Connection closed by foreign host.")
+
+        self._received += bytearray(received)
+        data = self._process()
+        self._log(data, 'read')
+        return data
+
+    def _send_raw(self, data):
+        """Send the raw data to the socket.
+
+        Raises:
+            pexpect.TIMEOUT: If the data is not sent within `write_timeout` seconds, i.e. the host does not read.
+            OSError: If the connection is closed or the socket error occurs.
+        """
+        if self.closed:
+            raise OSError(errno.EBADF, "Connection closed")
+        try:
+            self._socket.settimeout(self.write_timeout)
+            self._socket.sendall(str(data))
+        except socket.timeout:
+            raise pexpect.TIMEOUT("Timeout exceeded. Data not sent within {} seconds.".format(self.write_timeout))
+        except socket.error as e:  # pylint: disable=invalid-name
+            raise OSError(e.args[0], e.args[-1])
+        finally:
+            self._socket.setblocking(False)
+
+    def send(self, s):
+        """Send the string to the host converting the line ends to the telnet ones and return the length."""
+        s = self._coerce_send_string(s)
+        self._log(s, 'send')
+        self._send_raw(_NEWLINE_RE.sub(_newline, s).replace(chr(IAC), chr(IAC) * 2))
+        return len(s)
+
+    def sendline(self, s=''):
+        """Send the string followed by the line end."""
+        return self.send(s + self.linesep)
+
+    def sendcontrol(self, char):
+        """Send the control character, i.e. sendcontrol('c') sends Ctrl-C."""
+        char = char.lower()
+        code = ord(char)
+        if 97 <= code <= 122:
+            code = code - 97 + 1
+        else:
+            code = _CONTROL_CHARS.get(char)
+            if code is None:
+                return 0
+        return self.send(chr(code))
+
+    def write(self, s):
+        """Write to the host."""
+        self.send(s)
+
+    def writelines(self, sequence):
+        """Write each string from the sequence to the host."""
+        for s in sequence:
+            self.send(s)
+
+    def setecho(self, state):  # pylint: disable=unused-argument
+        """Do nothing. The echo is provided by the host."""
+        pass
+
+    def getwinsize(self):
+        """Return the terminal window size as (rows, cols) tuple."""
+        return self.rows, self.cols
+
+    def setwinsize(self, rows, cols):
+        """Set the terminal window size and report it to the host if negotiated."""
+        self.rows, self.cols = rows, cols
+        if NAWS in self._enabled and not self.closed:
+            self._send_naws()
+
+    def isalive(self):
+        """Return True if the connection is open."""
+        return not self.closed
+
+    def close(self, force=True):
+        """Close the connection.
+
+        The end of data is signalled to the host first and the data sent by the host is discarded until it closes
+        the connection or `close_timeout` seconds passes. It prevents the connection reset when the host is still
+        writing while the socket is being closed.
+        """
+        if self._socket is not None and not self.closed:
+            logger.debug("Closing connection to {}:{}".format(self.hostname, self.port))
+            try:
+                self._socket.shutdown(socket.SHUT_WR)
+                self._drain(self.close_timeout)
+            except socket.error:
+                pass
+            self._socket.close()
+        self.closed = True
+        self.child_fd = -1
+
+    def _drain(self, timeout):
+        end_time = time.time() + timeout
+        while True:
+            remaining = end_time - time.time()
+            if remaining <= 0 or not select.select([self._socket], [], [], remaining)[0]:
+                return
+            if not self._socket.recv(self.maxread):
+                return
+
+    def wait(self):
+        """Do nothing. There is no child process to wait for."""
+        pass
@@ -2,12 +2,20 @@
 
 import logging
 import socket
+import select
+import errno
+import threading
 import codecs
 import time
 import re
 import os
 import yaml
 
+logger = logging.getLogger(__name__)
+
+# The time in seconds the reachability checks are waited for above the timeout
+REACHABILITY_GRACE = 0.5
+
 
 def delegate(attribute_name, method_names):
     """Pass the call to the attribute called attribute_name for every method listed in method_names."""
@@ -46,40 +54,129 @@ def to_list(item):
     return [item]
 
 
-def is_reachable(host, port=23):
+def _interleave_addresses(addresses):
+    """Return the addresses with alternating address families starting with the first one returned (RFC 8305)."""
+    families = []
+    by_family = {}
+    for address in addresses:
+        family = address[0]
+        if family not in by_family:
+            families.append(family)
+            by_family[family] = []
+        by_family[family].append(address)
+
+    result = []
+    while any(by_family.values()):
+        for family in families:
+            if by_family[family]:
+                result.append(by_family[family].pop(0))
+    return result
+
+
+def is_reachable(host, port=23, timeout=2, attempt_delay=0.25):
     """Check reachability for specified hostname/port.
 
-    It tries to open TCP socket.
-    It supports IPv6.
-    :param host: hostname or ip address string
-    :rtype: str
-    :param port: tcp port number
-    :rtype: number
-    :return: True if host is reachable else false
+    It tries to open TCP socket. It supports IPv6. All the addresses of the host are tried in the happy eyeballs
+    style (RFC 8305), alternating the address families. The next connection attempt starts after `attempt_delay`
+    or as soon as the previous one fails, without waiting for the previous attempts to finish.
+
+    Args:
+        host (str): The hostname or ip address string.
+        port (int): The TCP port number.
+        timeout (float): The maximum time in seconds to wait for any connection to succeed.
+        attempt_delay (float): The delay in seconds between starting the connection attempts.
+
+    Returns:
+        True if host is reachable else False.
     """
+    end_time = time.time() + timeout
     try:
-        addresses = socket.getaddrinfo(
-            host, port, socket.AF_UNSPEC, socket.SOCK_STREAM
-        )
+        addresses = _interleave_addresses(socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM))
     except socket.gaierror:
         return False
 
-    for family, _, _, _, sockaddr in addresses:
-        sock = socket.socket(family, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        try:
-            sock.connect(sockaddr)
-        except IOError:
-            continue
-
-        sock.shutdown(socket.SHUT_RDWR)
-        sock.close()
-        # Wait 2 sec for socket to shutdown
-        time.sleep(2)
-        break
-    else:
+    pending = {}
+    try:
+        while addresses or pending:
+            now = time.time()
+            if now >= end_time:
+                return False
+
+            if addresses:
+                family, socktype, proto, _, sockaddr = addresses.pop(0)
+                sock = socket.socket(family, socktype, proto)
+                sock.setblocking(False)
+                result = sock.connect_ex(sockaddr)
+                if result == 0:
+                    sock.close()
+                    return True
+                if result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    pending[sock.fileno()] = sock
+                else:
+                    sock.close()
+                    continue
+                wait = min(attempt_delay, end_time - now) if addresses else end_time - now
+            else:
+                wait = end_time - now
+
+            _, writable, _ = select.select([], list(pending.values()), [], wait)
+            for sock in writable:
+                del pending[sock.fileno()]
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sock.close()
+                if error == 0:
+                    return True
         return False
-    return True
+    finally:
+        for sock in pending.values():
+            sock.close()
+
+
+def hops_reachability(hop_infos, timeout=2):
+    """Check the reachability of all the hops concurrently.
+
+    Refer to :meth:`condoor.hopinfo.HopInfo.check_reachability`. The checks not finished within `timeout` plus
+    the short grace period, i.e. waiting for the slow name resolution or the `verify_reachability` callable, are
+    not waited for.
+
+    Args:
+        hop_infos (list): The list of :class:`condoor.hopinfo.HopInfo` objects.
+        timeout (float): The maximum time in seconds to wait for the hop to respond.
+
+    Returns:
+        dict: Mapping the hop info to True if the hop is reachable else False. The hop which check raised
+        the exception or did not finish in time is reported reachable, so the connection attempt reports
+        the actual error.
+    """
+    results = {}
+
+    def check(hop_info):
+        """Check the single hop."""
+        try:
+            reachable = hop_info.check_reachability(timeout)
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Reachability check of {}:{} failed".format(hop_info.hostname, hop_info.port),
+                         exc_info=True)
+            reachable = True
+        results[hop_info] = reachable
+
+    hop_infos = set(hop_infos)
+    threads = [threading.Thread(target=check, args=(hop_info,)) for hop_info in hop_infos]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    end_time = time.time() + timeout + REACHABILITY_GRACE
+    for thread in threads:
+        thread.join(max(0, end_time - time.time()))
+
+    reachability = {}
+    for hop_info in hop_infos:
+        reachable = results.get(hop_info)
+        if reachable is None:
+            logger.debug("Reachability check of {}:{} not finished in time".format(hop_info.hostname, hop_info.port))
+            reachable = True
+        reachability[hop_info] = reachable
+    return reachability
 
 
 def pattern_to_str(pattern):
@@ -0,0 +1,141 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+from unittest import TestCase
+from threading import Lock, Event, Timer
+import time
+
+from mock import patch
+
+import condoor
+from condoor.fleet import Fleet
+from condoor.stats import FSMStats
+
+
+class FakeConnection(object):
+    lock = Lock()
+    running = 0
+    max_running = 0
+
+    def __init__(self, name, urls, **kwargs):
+        self.name = name
+        self.urls = urls
+        self.is_connected = False
+        self.fsm_stats = FSMStats()
+        self.cancelled = Event()
+
+    def connect(self, force_discovery=False, deadline=None):
+        with self.lock:
+            FakeConnection.running += 1
+            FakeConnection.max_running = max(FakeConnection.max_running, FakeConnection.running)
+        time.sleep(0.02 * int(self.name[-1]))
+        with self.lock:
+            FakeConnection.running -= 1
+        if "dead" in self.urls:
+            raise condoor.ConnectionTimeoutError("Connection timeout")
+        self.is_connected = True
+
+    def send(self, cmd, timeout=60, deadline=None):
+        self.fsm_stats.record_run("WAIT-4-STRING")
+        if cmd == "hang":
+            if self.cancelled.wait(5 if deadline is None else deadline.remaining):
+                raise condoor.ConnectionCancelledError("Operation cancelled")
+            if deadline is not None:
+                raise condoor.DeadlineExceededError("Deadline exceeded")
+        if cmd == "wrong":
+            raise condoor.CommandSyntaxError("Command unknown", command=cmd)
+        return "{}: {}".format(self.name, cmd)
+
+    def disconnect(self):
+        self.is_connected = False
+
+    def cancel(self, send_ctrl_c=False):
+        self.cancelled.set()
+
+
+class TestFleet(TestCase):
+    def setUp(self):
+        patcher = patch('condoor.connection.Connection', FakeConnection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        FakeConnection.max_running = 0
+
+    def test_fleet_results(self):
+        """Fleet: Test the results are streamed as they complete"""
+        targets = {"r3": "telnet://host3", "r1": "telnet://host1", "r2": "telnet://dead"}
+        fleet = Fleet(targets, workers=3)
+        results = list(fleet.run(["show version", "show users"]))
+
+        self.assertEqual([result.name for result in results], ["r1", "r2", "r3"])
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].outputs, [("show version", "r1: show version"), ("show users", "r1: show users")])
+        self.assertIsInstance(results[1].error, condoor.ConnectionTimeoutError)
+        self.assertEqual(results[1].outputs, [])
+
+    def test_fleet_command_error(self):
+        """Fleet: Test the command error stops the device processing"""
+        fleet = Fleet(["telnet://host1"])
+        result = next(fleet.run(["show version", "wrong", "show users"]))
+        self.assertIsInstance(result.error, condoor.CommandSyntaxError)
+        self.assertEqual(result.outputs, [("show version", "0: show version")])
+
+    def test_fleet_workers(self):
+        """Fleet: Test the number of workers is bounded"""
+        fleet = Fleet(["telnet://host{}".format(index) for index in range(10)], workers=2)
+        results = list(fleet.run(["show version"]))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(FakeConnection.max_running, 2)
+
+    def test_fleet_fsm_stats(self):
+        """Fleet: Test the FSM statistics are merged from all the devices"""
+        fleet = Fleet(["telnet://host1", "telnet://host2", "telnet://dead"])
+        list(fleet.run(["show version", "show users"]))
+        self.assertEqual(fleet.fsm_stats.as_dict()["WAIT-4-STRING"]["runs"], 4)
+
+    def test_fleet_cancel(self):
+        """Fleet: Test the cancel stops the commands in progress and skips the remaining devices"""
+        fleet = Fleet(["telnet://host{}".format(index) for index in range(6)], workers=3)
+        timer = Timer(0.3, fleet.cancel)
+        timer.start()
+        begin = time.time()
+        results = list(fleet.run(["hang"]))
+        self.assertLess(time.time() - begin, 2)
+        timer.join()
+        self.assertEqual(len(results), 6)
+        for result in results:
+            self.assertIsInstance(result.error, condoor.ConnectionCancelledError)
+
+    def test_fleet_device_timeout(self):
+        """Fleet: Test the hung device is stopped at the device deadline"""
+        fleet = Fleet(["telnet://host1", "telnet://host2"], workers=2)
+        begin = time.time()
+        results = list(fleet.run(["show version", "hang"], device_timeout=0.3))
+        self.assertLess(time.time() - begin, 2)
+        for result in results:
+            self.assertIsInstance(result.error, condoor.DeadlineExceededError)
+            self.assertEqual(len(result.outputs), 1)
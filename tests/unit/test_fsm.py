@@ -29,9 +29,11 @@
 from unittest import TestCase
 
 from condoor.fsm import FSM, action
+from condoor import fsm
 import condoor
 import pexpect
-from mock import Mock
+from mock import Mock, patch
+from collections import deque
 from functools import partial
 
 
@@ -280,3 +282,100 @@ class TestFSM(TestCase):
 
         result = sm.run()
         self.assertFalse(result)
+
+    def test_fsm_transition_table(self):
+        """FSM: Test dense transition table"""
+
+        class Device(object):
+            ctrl = Mock()
+
+        device = Mock(spec=Device)
+
+        error = condoor.ConnectionError("Error")
+        events = ["STATE1", "STATE2", pexpect.TIMEOUT]
+        transitions = [
+            ("STATE1", [0, 1], 1, None, 0),
+            ("STATE2", [1], 2, partial(len), 10),
+            ("STATE2", [1], -1, error, 0),
+            (pexpect.TIMEOUT, [2], 0, "not callable", 0),
+        ]
+
+        sm = FSM("FSM", device, events=events, transitions=transitions)
+        self.assertEqual(sm.n_states, 3)
+        self.assertEqual(len(sm.transition_table), 9)
+        self.assertEqual(sm.transition_table[0 * 3 + 0], (1, fsm.ACTION_NONE, None, 0))
+        self.assertEqual(sm.transition_table[0 * 3 + 1], (1, fsm.ACTION_NONE, None, 0))
+        self.assertEqual(sm.transition_table[1 * 3 + 1], (-1, fsm.ACTION_RAISE, error, 0))
+        self.assertEqual(sm.transition_table[2 * 3 + 2], (0, fsm.ACTION_INVALID, "not callable", 0))
+        self.assertIsNone(sm.transition_table[1 * 3 + 0])
+
+    def test_fsm_validate(self):
+        """FSM: Test FSM definition validation"""
+
+        class Device(object):
+            ctrl = Mock()
+
+        device = Mock(spec=Device)
+
+        events = ["STATE1", "STATE2", "STATE3", pexpect.TIMEOUT]
+        transitions = [
+            ("STATE1", [0], 1, None, 0),
+            ("STATE2", [1], -1, None, 0),
+            ("STATE3", [3], -1, None, 0),
+        ]
+
+        sm = FSM("FSM", device, events=events, transitions=transitions)
+        self.assertEqual(sm.validate(), ["Unreachable state: 3", "Event without transition: TIMEOUT"])
+
+    def test_fsm_trace(self):
+        """FSM: Test transitions trace"""
+
+        class Ctrl(object):
+            hostname = "hostname"
+            trace = deque(maxlen=3)
+
+            def expect(self, events, searchwindowsize, timeout):
+                pass
+
+            def dump_trace(self):
+                pass
+
+        class Device(object):
+            ctrl = Mock(spec=Ctrl)
+
+        device = Mock(spec=Device)
+        device.ctrl.trace = deque(maxlen=3)
+        device.ctrl.expect.return_value = 0
+
+        events = ["STATE1", pexpect.TIMEOUT]
+        transitions = [
+            ("STATE1", [0], 0, None, 0),
+        ]
+
+        sm = FSM("TRACE", device, events=events, transitions=transitions, max_transitions=5)
+        self.assertFalse(sm.run())
+        self.assertEqual(len(device.ctrl.trace), 3)
+        self.assertEqual(device.ctrl.trace[0][1:6], ("TRACE", 0, 0, 0, None))
+        device.ctrl.dump_trace.assert_called_once_with()
+
+        device.ctrl.expect.return_value = 1
+        device.ctrl.expect.side_effect = pexpect.EOF("EOF")
+        with self.assertRaises(condoor.ConnectionError):
+            sm.run()
+        self.assertEqual(device.ctrl.dump_trace.call_count, 2)
+
+    def test_action_debug_disabled(self):
+        """FSM: Test action not logging when debug disabled"""
+
+        @action
+        def action1(ctx):
+            """Action 1"""
+            return ctx
+
+        with patch.object(fsm.logger, "isEnabledFor", return_value=False), patch.object(fsm.logger, "debug") as debug:
+            self.assertEqual(action1(1), 1)
+        self.assertFalse(debug.called)
+
+        with patch.object(fsm.logger, "isEnabledFor", return_value=True), patch.object(fsm.logger, "debug") as debug:
+            self.assertEqual(action1(1), 1)
+        debug.assert_called_once_with("A=Action 1")
@@ -0,0 +1,81 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+import pickle
+from unittest import TestCase
+
+from mock import MagicMock
+
+from condoor import CommandOutput
+from condoor.device import Device
+from condoor.hopinfo import make_hop_info_from_url
+from condoor.replay import ScriptedController
+
+
+class TestCommandOutput(TestCase):
+    def test_from_raw(self):
+        raw = "show clock\r\n06:33:02.218 UTC\r\nThu Jan 19 2017\r\n"
+        output = CommandOutput.from_raw(raw, "show clock", 0.5)
+        self.assertIsInstance(output, str)
+        self.assertEqual(output, "06:33:02.218 UTC\nThu Jan 19 2017\n")
+        self.assertFalse(hasattr(output, "raw"))
+        self.assertEqual(output.size, len(raw))
+        self.assertEqual((output.command, output.elapsed, output.exit_status), ("show clock", 0.5, None))
+        self.assertEqual(output.find("UTC"), 13)
+        self.assertEqual(output.lines(), ["06:33:02.218 UTC", "Thu Jan 19 2017"])
+        self.assertIs(output.lines(), output.lines())
+
+    def test_single_line(self):
+        self.assertEqual(CommandOutput.from_raw("no echo line\r"), "no echo line")
+        self.assertEqual(CommandOutput.from_raw(""), "")
+        self.assertEqual(CommandOutput.from_raw("").lines(), [])
+
+    def test_pickle(self):
+        output = CommandOutput.from_raw("cmd\r\nline\r\n", "cmd", 1.0, 0)
+        restored = pickle.loads(pickle.dumps(output, pickle.HIGHEST_PROTOCOL))
+        self.assertIsInstance(restored, CommandOutput)
+        self.assertEqual(restored, output)
+        self.assertEqual((restored.size, restored.command, restored.elapsed, restored.exit_status),
+                         (len("cmd\r\nline\r\n"), "cmd", 1.0, 0))
+
+    def test_send(self):
+        device = Device(MagicMock(), make_hop_info_from_url("telnet://admin:admin@r1"), "XR", True)
+        device.prompt = "RP/0/RSP0/CPU0:ios#"
+        device.prompt_re = device.driver.make_dynamic_prompt(device.prompt)
+        device.connected = True
+        connection = MagicMock()
+        connection.session_fd = None
+        device.ctrl = ScriptedController(connection, {"show users": "Line\r\ncon0"}, prompt=device.prompt).start()
+        output = device.send("show users")
+        self.assertIsInstance(output, CommandOutput)
+        self.assertEqual(output.lines(), ["Line", "con0"])
+        self.assertEqual(output.command, "show users")
+        self.assertGreaterEqual(output.elapsed, 0)
+        self.assertEqual(output.size, len("\r\nLine\r\ncon0\r\n"))
+        self.assertEqual([output.command for output in device.send_many(["show users", "show clock"])],
+                         ["show users", "show clock"])
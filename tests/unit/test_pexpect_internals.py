@@ -0,0 +1,94 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+
+import os
+from unittest import TestCase
+
+import pexpect
+from pexpect.fdpexpect import fdspawn
+
+from condoor.controller import _SlicedExpecter
+
+
+class Recorder(object):
+    """Logfile recording the data and the text before the match buffered by the session at the time of write."""
+
+    def __init__(self, spawn):
+        self.spawn = spawn
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append((data, self.spawn._before.getvalue()))
+
+    def flush(self):
+        pass
+
+
+class TestPexpectInternals(TestCase):
+    """The pexpect internals the controller output sink and the sliced wait rely on."""
+
+    def setUp(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.spawn = fdspawn(self.read_fd, timeout=1)
+
+    def tearDown(self):
+        os.close(self.write_fd)
+        self.spawn.close()
+
+    def test_logfile_read_before_buffering(self):
+        self.spawn.logfile_read = Recorder(self.spawn)
+        os.write(self.write_fd, "output R1#")
+        self.assertEqual(self.spawn.expect_exact("R1#"), 0)
+        # the data is passed to logfile_read before it is added to the _before buffer
+        self.assertEqual(self.spawn.logfile_read.writes, [("output R1#", "")])
+        self.assertIsInstance(self.spawn._before, self.spawn.buffer_type)
+        self.assertEqual(self.spawn.before, "output ")
+
+    def test_no_match_buffers(self):
+        os.write(self.write_fd, "abcdefgh")
+        with self.assertRaises(pexpect.TIMEOUT):
+            self.spawn.expect_exact("XYZ", timeout=0.1)
+        # the text since the last match is kept in _before and the search buffer is trimmed to the lookback
+        self.assertEqual(self.spawn._before.getvalue(), "abcdefgh")
+        self.assertEqual(self.spawn._buffer.getvalue(), "fgh")
+        self.assertEqual(self.spawn.before, "abcdefgh")
+
+    def test_sliced_expecter(self):
+        expecter = _SlicedExpecter(self.spawn, pexpect.searcher_string(["XYZ"]))
+        expecter.last = False
+        os.write(self.write_fd, "abcdefgh")
+        with self.assertRaises(pexpect.TIMEOUT):
+            expecter.expect_loop(0.1)
+        self.assertEqual(self.spawn._buffer.getvalue(), "fgh")
+
+        expecter.resumed = True
+        expecter.last = True
+        os.write(self.write_fd, "ijXYZ")
+        self.assertEqual(expecter.expect_loop(1), 0)
+        self.assertEqual(self.spawn.before, "abcdefghij")
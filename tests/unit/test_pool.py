@@ -0,0 +1,144 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+import time
+from unittest import TestCase
+
+from mock import patch
+
+import condoor
+from condoor.pool import SessionPool
+
+
+class FakeConnection(object):
+    created = 0
+
+    def __init__(self, name, urls, **kwargs):
+        FakeConnection.created += 1
+        self.name = name
+        self.hostname = name
+        self.urls = urls
+        self.is_connected = False
+        self.alive = True
+        self.sent = []
+
+    def connect(self, force_discovery=False):
+        self.is_connected = True
+
+    def send(self, cmd, timeout=60):
+        if not self.alive:
+            raise condoor.ConnectionError("Session disconnected")
+        self.sent.append(cmd)
+        return ""
+
+    def disconnect(self):
+        self.is_connected = False
+
+
+class TestSessionPool(TestCase):
+    def setUp(self):
+        patcher = patch('condoor.connection.Connection', FakeConnection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        FakeConnection.created = 0
+
+    def test_reuse(self):
+        """SessionPool: Test the released session is reused for the same urls"""
+        pool = SessionPool()
+        with pool.session("telnet://host1") as conn:
+            first = conn
+        self.assertEqual(pool.idle, 1)
+        self.assertTrue(first.is_connected)
+
+        with pool.session(["telnet://host1"]) as conn:
+            self.assertIs(conn, first)
+            self.assertEqual(conn.sent, [""])
+            self.assertEqual(pool.leased, 1)
+
+        with pool.session("telnet://host2") as conn:
+            self.assertIsNot(conn, first)
+        self.assertEqual(FakeConnection.created, 2)
+
+        pool.close()
+        self.assertEqual(pool.idle, 0)
+        self.assertFalse(first.is_connected)
+
+    def test_dead_session(self):
+        """SessionPool: Test the idle session failing the prompt check is replaced"""
+        pool = SessionPool()
+        conn = pool.lease("telnet://host1")
+        pool.release(conn)
+        conn.alive = False
+        other = pool.lease("telnet://host1")
+        self.assertIsNot(other, conn)
+        self.assertFalse(conn.is_connected)
+
+        with self.assertRaises(condoor.ConnectionError):
+            with pool.session("telnet://host1") as conn:
+                raise condoor.ConnectionError("Connection lost")
+        self.assertFalse(conn.is_connected)
+        self.assertEqual(pool.idle, 0)
+
+    def test_eviction(self):
+        """SessionPool: Test the idle sessions are evicted on size cap and ttl"""
+        pool = SessionPool(max_size=2, idle_ttl=60)
+        conns = [pool.lease("telnet://host{}".format(index)) for index in range(3)]
+        for conn in conns:
+            pool.release(conn)
+        self.assertEqual(pool.idle, 2)
+        self.assertFalse(conns[0].is_connected)
+
+        with patch('condoor.pool.time.time', return_value=1e12):
+            pool.lease("telnet://host2")
+        self.assertEqual(pool.idle, 0)
+        self.assertFalse(conns[1].is_connected)
+        self.assertFalse(conns[2].is_connected)
+
+        with self.assertRaises(ValueError):
+            pool.release(conns[0])
+
+    def test_eviction_without_lease(self):
+        """SessionPool: Test the expired idle sessions are disconnected when the pool is not used"""
+        pool = SessionPool(idle_ttl=0.1)
+        first = pool.lease("telnet://host1")
+        second = pool.lease("telnet://host2")
+        pool.release(first)
+        time.sleep(0.15)
+        # the release evicts the expired sessions
+        pool.release(second)
+        self.assertFalse(first.is_connected)
+        self.assertEqual(pool.idle, 1)
+
+        # the background thread evicts the sessions without any lease or release
+        for _ in range(20):
+            if not second.is_connected:
+                break
+            time.sleep(0.05)
+        self.assertFalse(second.is_connected)
+        self.assertEqual(pool.idle, 0)
+        pool.close()
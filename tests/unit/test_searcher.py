@@ -0,0 +1,199 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+import re
+from collections import deque
+from unittest import TestCase
+
+import pexpect
+from pexpect.spawnbase import SpawnBase
+from mock import patch, MagicMock
+
+from condoor.controller import Controller, _SlicedExpecter
+from condoor.searcher import IncrementalSearcher, pattern_window, set_pattern_window, combine_patterns
+
+
+class ChunkSpawn(SpawnBase):
+    """Spawn returning the predefined chunks of data."""
+
+    def __init__(self, chunks):
+        super(ChunkSpawn, self).__init__(timeout=1)
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if not self.chunks:
+            raise pexpect.EOF("EOF")
+        self.reads += 1
+        return self.chunks.pop(0)
+
+
+PATTERNS = [re.compile("% Invalid input"), re.compile(" --More-- "), re.compile(r"(?P<hostname>[\w\-]+)#"),
+            pexpect.TIMEOUT, pexpect.EOF]
+
+
+class TestIncrementalSearcher(TestCase):
+    def test_pattern_window(self):
+        self.assertEqual(pattern_window(re.compile("abc"), 100), 3)
+        self.assertEqual(pattern_window(re.compile("x{2,5}y"), 100), 6)
+        self.assertEqual(pattern_window(re.compile("a.*b"), 100), 100)
+
+    def test_declared_window(self):
+        set_pattern_window("declared.*window", 40)
+        self.assertEqual(pattern_window(re.compile("declared.*window"), 100), 40)
+
+    def test_searcher_attributes(self):
+        searcher = IncrementalSearcher(PATTERNS, default_window=64)
+        self.assertEqual(searcher.timeout_index, 3)
+        self.assertEqual(searcher.eof_index, 4)
+        self.assertEqual(searcher.longest_string, 64)
+
+    def test_same_match_as_full_search(self):
+        text = "show run\r\n" + "interface GigabitEthernet0/0/0/{}\r\n shutdown\r\n" * 200 + "\r\nRP-0-CPU0-ios#"
+        for chunk_size, combine in ((7, False), (100, False), (5000, False), (7, True), (5000, True)):
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+            full = ChunkSpawn(chunks)
+            full_index = full.expect_list(PATTERNS, timeout=30)
+
+            incremental = ChunkSpawn(chunks)
+            searcher = IncrementalSearcher(PATTERNS, default_window=64, combine=combine)
+            index = incremental.expect_loop(searcher, timeout=30)
+
+            self.assertEqual(index, full_index)
+            self.assertEqual(incremental.before, full.before)
+            self.assertEqual(incremental.after, full.after)
+            self.assertEqual(incremental.match.group("hostname"), "RP-0-CPU0-ios")
+
+    def test_match_across_chunks(self):
+        spawn = ChunkSpawn(["line\r\n --Mo", "re-- rest"])
+        index = spawn.expect_loop(IncrementalSearcher(PATTERNS, default_window=64), timeout=1)
+        self.assertEqual(index, 1)
+        self.assertEqual(spawn.before, "line\r\n")
+        self.assertEqual(spawn.buffer, "rest")
+
+    def test_earliest_match_wins(self):
+        spawn = ChunkSpawn(["R1# % Invalid input"])
+        self.assertEqual(spawn.expect_loop(IncrementalSearcher(PATTERNS, default_window=64), timeout=1), 2)
+
+    def test_search_buffer_bounded(self):
+        spawn = ChunkSpawn(["x" * 999 + "\n"] * 50 + ["R1#"])
+        spawn.expect_loop(IncrementalSearcher(PATTERNS, default_window=64), timeout=1)
+        self.assertEqual(len(spawn.before), 50000)
+        self.assertEqual(spawn.after, "R1#")
+        self.assertLessEqual(len(spawn.buffer), 64)
+
+    def test_anchored(self):
+        prompt_re = re.compile(r"^(?P<hostname>[\w\-\_\=\+]+)(\([^()]*\))?[#|>]")
+        patterns = [prompt_re, re.compile("(?m)^login:"), pexpect.TIMEOUT, pexpect.EOF]
+        for chunks in (["hello world\r\n" + "a" * 100, "# not a prompt"],
+                       ["R1", "#"],
+                       ["hello " * 20, "\r\nlogin:"],
+                       ["hello " * 20 + "login:"]):
+            for combine in (False, True):
+                full = ChunkSpawn(chunks)
+                full_index = full.expect_list(patterns, timeout=1)
+
+                incremental = ChunkSpawn(chunks)
+                index = incremental.expect_loop(IncrementalSearcher(patterns, default_window=64, combine=combine),
+                                                timeout=1)
+                self.assertEqual(index, full_index)
+                self.assertEqual(incremental.after, full.after)
+
+
+class TestCombinePatterns(TestCase):
+    def test_named_groups(self):
+        patterns = [re.compile(r"(?P<hostname>R1)>"), re.compile(r"(?P<hostname>[\w\-]+)#")]
+        self.assertIsNotNone(combine_patterns(patterns))
+
+        searcher = IncrementalSearcher(patterns, combine=True)
+        self.assertEqual(searcher.search("output\r\nR2#", 11), 1)
+        self.assertEqual(searcher.match.group("hostname"), "R2")
+        self.assertEqual(searcher.match.re, patterns[1])
+
+    def test_alternation_in_pattern(self):
+        patterns = [re.compile("x|abc"), re.compile("ab|b")]
+        searcher = IncrementalSearcher(patterns, combine=True)
+        self.assertEqual(searcher.search("zab", 3), 1)
+        self.assertEqual(searcher.match.group(), "ab")
+        self.assertEqual(searcher.search("zabc", 4), 0)
+        self.assertEqual(searcher.match.group(), "abc")
+
+    def test_first_listed_wins(self):
+        patterns = [re.compile("abc"), re.compile("ab"), re.compile("b")]
+        searcher = IncrementalSearcher(patterns, combine=True)
+        self.assertEqual(searcher.search("xxabc", 5), 0)
+        self.assertEqual(IncrementalSearcher(patterns[1:], combine=True).search("xxabc", 5), 0)
+        self.assertEqual(IncrementalSearcher(patterns[::-1], combine=True).search("xxabc", 5), 1)
+
+    def test_not_combinable(self):
+        self.assertIsNone(combine_patterns([re.compile(r"(a)\1"), re.compile("b")]))
+        self.assertIsNone(combine_patterns([re.compile("(?i)a"), re.compile("b")]))
+        self.assertIsNone(combine_patterns([re.compile("a", re.I), re.compile("b")]))
+        self.assertIsNone(combine_patterns([]))
+
+        searcher = IncrementalSearcher([re.compile(r"(a)\1"), re.compile("b"), pexpect.TIMEOUT], combine=True)
+        self.assertEqual(searcher.search("xbaa", 4), 1)
+        self.assertEqual(searcher.search("xaab", 4), 0)
+        self.assertEqual(IncrementalSearcher([pexpect.TIMEOUT], combine=True).search("xaab", 4), -1)
+
+
+class TestControllerExpect(TestCase):
+    def setUp(self):
+        self.ctrl = Controller(MagicMock())
+        self.ctrl._session = ChunkSpawn(["output\r\nR1#"])
+
+    @patch.dict("condoor.controller._C", {"search_mode": "incremental", "search_window": 64, "search_combined": False})
+    def test_incremental(self):
+        with patch.object(_SlicedExpecter, "expect_loop", autospec=True,
+                          side_effect=_SlicedExpecter.expect_loop) as expect_loop:
+            self.assertEqual(self.ctrl.expect(PATTERNS), 2)
+        self.assertIsInstance(expect_loop.call_args[0][0].searcher, IncrementalSearcher)
+        self.assertEqual(self.ctrl.before, "output\r\n")
+
+    @patch.dict("condoor.controller._C", {"search_mode": "full", "search_window": 64, "search_combined": False})
+    def test_full(self):
+        with patch.object(_SlicedExpecter, "expect_loop", autospec=True,
+                          side_effect=_SlicedExpecter.expect_loop) as expect_loop:
+            self.assertEqual(self.ctrl.expect(PATTERNS, timeout=5), 2)
+        expecter, timeout = expect_loop.call_args[0]
+        self.assertIsInstance(expecter.searcher, pexpect.searcher_re)
+        self.assertEqual((timeout, expecter.searchwindowsize), (5, None))
+        self.assertEqual(self.ctrl.before, "output\r\n")
+
+
+class TestControllerTrace(TestCase):
+    def test_dump_trace(self):
+        self.ctrl = Controller(MagicMock())
+        self.ctrl.trace = deque([(1.0, "WAIT-4-STRING", 2, 0, -1, None, 0.5), (2.0, "RELOAD", 3, 1, 0, max, 0)])
+        with patch("condoor.controller.logger") as logger:
+            self.ctrl.dump_trace()
+        lines = [call[0][1] for call in logger.log.call_args_list]
+        self.assertEqual(lines[1:], ["1.000 WAIT-4-STRING E=2,S=0,NS=-1,A=None,RT=0.50",
+                                     "2.000 RELOAD E=3,S=1,NS=0,A=max,RT=0.00"])
+        self.assertEqual(len(self.ctrl.trace), 0)
@@ -0,0 +1,110 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+from unittest import TestCase
+
+import pexpect
+from mock import Mock
+
+from condoor.fsm import FSM
+from condoor.stats import FSMStats, Timing
+
+
+class TestTiming(TestCase):
+    def test_add_merge(self):
+        timing = Timing()
+        for value in (0.005, 0.5, 0.7, 100):
+            timing.add(value)
+        self.assertEqual(timing.count, 4)
+        self.assertAlmostEqual(timing.total, 101.205)
+        self.assertEqual(timing.max, 100)
+        self.assertEqual(timing.histogram, [1, 0, 2, 0, 0, 1])
+
+        other = Timing()
+        other.add(5)
+        timing.merge(other)
+        self.assertEqual(timing.as_dict(), {"count": 5, "total": timing.total, "max": 100,
+                                            "histogram": [1, 0, 2, 1, 0, 1]})
+
+
+class TestFSMStats(TestCase):
+    def test_record_merge(self):
+        stats = FSMStats()
+        stats.record_run("SSH-AUTH")
+        stats.record_transition("SSH-AUTH", 1, "password", 28.0, False)
+        stats.record_transition("SSH-AUTH", 1, "TIMEOUT", 30.0, True)
+        stats.record_action("SSH-AUTH", 0.1)
+        stats.record_exhausted("SSH-AUTH")
+
+        other = FSMStats()
+        other.record_run("SSH-AUTH")
+        other.record_transition("SSH-AUTH", 0, "password", 1.0, False)
+        other.record_run("WAIT-4-STRING")
+
+        merged = FSMStats.merged([stats, other]).as_dict()
+        self.assertEqual(sorted(merged), ["SSH-AUTH", "WAIT-4-STRING"])
+        auth = merged["SSH-AUTH"]
+        self.assertEqual((auth["runs"], auth["transitions"], auth["timeouts"], auth["exhausted"]), (2, 3, 1, 1))
+        self.assertEqual(auth["states"][1]["total"], 58.0)
+        self.assertEqual(auth["states"][0]["count"], 1)
+        self.assertEqual(auth["events"]["password"]["count"], 2)
+        self.assertEqual(auth["actions"]["count"], 1)
+        self.assertEqual(stats.as_dict()["SSH-AUTH"]["runs"], 1)
+
+        stats.clear()
+        self.assertEqual(stats.as_dict(), {})
+
+    def test_fsm_run(self):
+        class Ctrl(object):
+            hostname = "hostname"
+            stats = None
+
+            def expect(self, events, searchwindowsize, timeout):
+                pass
+
+        class Device(object):
+            ctrl = Mock(spec=Ctrl)
+
+        device = Mock(spec=Device)
+        device.ctrl.stats = FSMStats()
+        device.ctrl.expect.side_effect = [0, 1, 0]
+
+        events = ["STATE1", pexpect.TIMEOUT]
+        transitions = [
+            ("STATE1", [0], 1, lambda ctx: True, 0),
+            (pexpect.TIMEOUT, [1], 0, None, 0),
+        ]
+
+        sm = FSM("TEST", device, events=events, transitions=transitions, max_transitions=3)
+        self.assertFalse(sm.run())
+
+        stats = device.ctrl.stats.as_dict()["TEST"]
+        self.assertEqual((stats["runs"], stats["transitions"], stats["timeouts"], stats["exhausted"]), (1, 3, 1, 1))
+        self.assertEqual(stats["states"][0]["count"], 2)
+        self.assertEqual(stats["events"]["TIMEOUT"]["count"], 1)
+        self.assertEqual(stats["actions"]["count"], 2)
@@ -0,0 +1,102 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+import socket
+from unittest import TestCase
+
+import pexpect
+
+from condoor.telnetspawn import TelnetSpawn, IAC, DO, WILL, SB, SE, NAWS, ECHO, TTYPE
+
+
+class TestTelnetSpawn(TestCase):
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+
+    def _connect(self):
+        session = TelnetSpawn("127.0.0.1", self.port, timeout=2)
+        peer, _ = self.server.accept()
+        peer.settimeout(2)
+        return session, peer
+
+    def test_banner(self):
+        session, peer = self._connect()
+        session.expect_exact("Escape character is '^]'.")
+        self.assertIn("Connected to 127.0.0.1.", session.before)
+        session.close()
+        peer.close()
+
+    def test_negotiation(self):
+        session, peer = self._connect()
+        peer.sendall(str(bytearray([IAC, DO, NAWS, IAC, WILL, ECHO, IAC, DO, TTYPE])) + "Username: " +
+                     str(bytearray([IAC, IAC])))
+        session.expect_exact("Username: ")
+        session.expect_exact(chr(IAC))
+        reply = peer.recv(100)
+        self.assertIn(str(bytearray([IAC, WILL, NAWS, IAC, SB, NAWS, 0, 160, 4, 0, IAC, SE])), reply)
+        self.assertIn(str(bytearray([IAC, DO, ECHO])), reply)
+        self.assertTrue(reply.endswith(str(bytearray([IAC, WILL, TTYPE]))))
+
+        session.sendline("admin")
+        self.assertEqual(peer.recv(100), "admin\r\n")
+        session.close()
+        peer.close()
+
+    def test_split_command(self):
+        session, peer = self._connect()
+        session.expect_exact("'^]'.\r\n")
+        peer.sendall("ab" + chr(IAC))
+        self.assertEqual(session.read_nonblocking(100, 1), "ab")
+        peer.sendall(chr(WILL) + chr(ECHO) + "cd")
+        self.assertEqual(session.read_nonblocking(100, 1), "cd")
+        peer.close()
+        with self.assertRaises(pexpect.EOF):
+            session.read_nonblocking(100, 1)
+        self.assertFalse(session.isalive())
+
+    def test_write_timeout(self):
+        session, peer = self._connect()
+        session.write_timeout = 0.5
+        with self.assertRaises(pexpect.TIMEOUT):
+            for _ in range(1000):
+                session.send("x" * 65536)
+        session.close()
+        peer.close()
+
+    def test_connection_refused(self):
+        self.server.close()
+        session = TelnetSpawn("127.0.0.1", self.port, timeout=2)
+        index = session.expect(["Connection refused", pexpect.EOF])
+        self.assertEqual(index, 0)
+        self.assertFalse(session.isalive())
@@ -0,0 +1,115 @@
+# =============================================================================
+#
+# Copyright (c)  2016, Cisco Systems
+# All rights reserved.
+#
+# # Author: Klaudiusz Staniek
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+# Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF
+# THE POSSIBILITY OF SUCH DAMAGE.
+# =============================================================================
+
+import re
+from unittest import TestCase
+
+from mock import patch, MagicMock
+
+import pexpect
+
+from condoor.fsm import FSM
+from condoor.chain import NEVER_MATCH_RE
+from condoor.drivers import generic
+from condoor.drivers.generic import Driver
+from condoor.exceptions import CommandTimeoutError
+
+
+class Device(object):
+    def __init__(self):
+        self.ctrl = MagicMock()
+        self.hostname = "R1"
+        self.prompts = [NEVER_MATCH_RE]
+
+    def get_previous_prompts(self):
+        return list(self.prompts)
+
+
+@patch.object(FSM, "run", return_value=True)
+class TestWaitForStringCache(TestCase):
+    def setUp(self):
+        self.device = Device()
+        self.driver = Driver(self.device)
+        self.prompt_re = re.compile("R1#")
+
+    def test_reused(self, run):
+        with patch.object(self.driver, "make_wait_for_string_fsm",
+                          wraps=self.driver.make_wait_for_string_fsm) as make_fsm:
+            self.assertTrue(self.driver.wait_for_string(self.prompt_re, timeout=10))
+            self.assertTrue(self.driver.wait_for_string(self.prompt_re, timeout=20))
+        make_fsm.assert_called_once_with(self.prompt_re, [NEVER_MATCH_RE])
+        self.assertEqual(run.call_count, 2)
+
+        fsm = list(self.driver._wait_fsm_cache.values())[0]
+        self.assertEqual(fsm.timeout, 20)
+        self.assertIs(fsm.events[2], self.prompt_re)
+        self.assertIn(pexpect.TIMEOUT, fsm.events)
+
+    def test_invalidated(self, run):
+        with patch.object(self.driver, "make_wait_for_string_fsm",
+                          wraps=self.driver.make_wait_for_string_fsm) as make_fsm:
+            self.driver.wait_for_string(self.prompt_re)
+            self.driver.wait_for_string(re.compile("R1\(config\)#"))
+            self.device.prompts.append(re.compile("jumphost\$"))
+            self.driver.wait_for_string(self.prompt_re)
+            self.device.ctrl = MagicMock()
+            self.driver.wait_for_string(self.prompt_re)
+            self.device.hostname = "R2"
+            self.driver.wait_for_string(self.prompt_re)
+        self.assertEqual(make_fsm.call_count, 5)
+
+    def test_cleared(self, run):
+        with patch.object(self.driver, "make_wait_for_string_fsm",
+                          wraps=self.driver.make_wait_for_string_fsm) as make_fsm:
+            self.driver.wait_for_string(self.prompt_re)
+            self.driver.clear_wait_fsm_cache()
+            self.driver.wait_for_string(self.prompt_re)
+        self.assertEqual(make_fsm.call_count, 2)
+
+    def test_size_limited(self, run):
+        with patch.object(generic, "WAIT_FSM_CACHE_SIZE", 2):
+            for prompt in ("R1#", "R2#", "R3#"):
+                self.driver.wait_for_string(re.compile(prompt))
+        self.assertEqual([key[2].pattern for key in self.driver._wait_fsm_cache], ["R2#", "R3#"])
+
+
+class TestWaitForStringErrors(TestCase):
+    def test_new_exception_per_run(self):
+        device = Device()
+        device.ctrl.expect.return_value = 5  # pexpect.TIMEOUT
+        driver = Driver(device)
+        errors = []
+        for _ in range(2):
+            with self.assertRaises(CommandTimeoutError) as ctx:
+                driver.wait_for_string(re.compile("R1#"), timeout=1)
+            errors.append(ctx.exception)
+        self.assertEqual(len(driver._wait_fsm_cache), 1)
+        self.assertIsNot(errors[0], errors[1])
+        errors[0].command = "show version"
+        self.assertIsNone(errors[1].command)
+        self.assertEqual(str(errors[1]), "R1: Timeout waiting for prompt")